@@ -0,0 +1,127 @@
+"""
+Incremental achievements and streaks.
+
+Each new carbon calculation or quiz result is fed to ``AchievementEngine``
+once. The engine updates a small per-visitor ``AchievementState`` (running
+counters, personal bests, streaks, per-category baselines) and checks the
+rules against that state, so every event costs O(1) no matter how long the
+history gets - nothing is rescanned on reruns, and history entries that
+session_store has already archived to disk are never read back.
+"""
+from carbon_model import achievements_system
+
+CATEGORIES = ("transport", "electricity", "food")
+CATEGORY_TITLES = {
+    "transport": "🚲 Transport Trimmer",
+    "electricity": "💡 Power Saver",
+    "food": "🥗 Planet Plate",
+}
+# achievements_system tiers that describe a bad result; shown for that result only, never kept
+WARNING_TIERS = {"📈 Improvement Needed", "⚠️ High Alert", "🎯 Target for Change"}
+
+
+class AchievementState:
+    """Stored in st.session_state["achievement_state"]; plain attributes so it pickles for disk spill"""
+
+    def __init__(self):
+        self.entries = 0
+        self.first_total = None
+        self.last_total = None
+        self.best_total = None
+        self.new_best = False    # did the latest entry set a personal best?
+        self.streak = 0          # consecutive entries lower than the one before
+        self.best_streak = 0
+        self.baseline = {}       # category -> first recorded value
+        self.category_best = {}  # category -> lowest recorded value
+        self.quizzes = 0
+        self.quiz_best = 0
+        self.quiz_total = 0      # questions in the latest quiz
+        self.quiz_perfect = 0
+        self.unlocked = []       # achievement names, in unlock order
+
+
+class Rule:
+    def __init__(self, name, event, check):
+        self.name = name
+        self.event = event
+        self.check = check
+
+
+def _category_cut(cat, fraction):
+    def check(state, entry):
+        first = state.baseline.get(cat)
+        return bool(first) and entry.get(cat, first) <= first * (1 - fraction)
+    return check
+
+
+RULES = [
+    Rule("👣 First Footprint", "carbon", lambda s, e: s.entries == 1),
+    Rule("🥇 Personal Best", "carbon", lambda s, e: s.new_best and s.entries > 1),
+    Rule("📉 Improving x3", "carbon", lambda s, e: s.streak >= 3),
+    Rule("🚀 Improving x5", "carbon", lambda s, e: s.streak >= 5),
+    Rule("🏅 Improving x10", "carbon", lambda s, e: s.streak >= 10),
+    Rule("🔁 Regular Tracker", "carbon", lambda s, e: s.entries >= 10),
+    Rule("✂️ Footprint Halved", "carbon",
+         lambda s, e: s.entries > 1 and s.best_total <= 0.5 * s.first_total),
+    *[Rule(CATEGORY_TITLES[cat], "carbon", _category_cut(cat, 0.25)) for cat in CATEGORIES],
+    Rule("🧠 Quiz Taker", "quiz", lambda s, e: s.quizzes == 1),
+    Rule("🎓 Quiz Regular", "quiz", lambda s, e: s.quizzes >= 3),
+    Rule("💯 Quiz Master", "quiz", lambda s, e: s.quiz_perfect >= 1),
+    Rule("👑 Double Perfect", "quiz", lambda s, e: s.quiz_perfect >= 2),
+]
+
+
+class AchievementEngine:
+    """Stateless rule runner; all per-visitor data lives in AchievementState"""
+
+    def __init__(self, rules=RULES):
+        self.rules = {"carbon": [r for r in rules if r.event == "carbon"],
+                      "quiz": [r for r in rules if r.event == "quiz"]}
+
+    def _unlock(self, state, names):
+        new = []
+        for name in names:
+            if name not in state.unlocked:
+                state.unlocked.append(name)
+                new.append(name)
+        return new
+
+    def _run(self, state, event, entry):
+        return self._unlock(state, [r.name for r in self.rules[event]
+                                    if r.name not in state.unlocked and r.check(state, entry)])
+
+    def on_carbon(self, state, entry):
+        """Update state for one history entry; returns newly unlocked achievements"""
+        total = entry["total"]
+        state.entries += 1
+        if state.entries == 1:
+            state.first_total = total
+            state.baseline = {cat: entry[cat] for cat in CATEGORIES if cat in entry}
+        state.streak = state.streak + 1 if state.last_total is not None and total < state.last_total else 0
+        state.best_streak = max(state.best_streak, state.streak)
+        state.new_best = state.best_total is None or total < state.best_total
+        if state.new_best:
+            state.best_total = total
+        for cat in CATEGORIES:
+            if cat in entry:
+                state.category_best[cat] = min(entry[cat], state.category_best.get(cat, entry[cat]))
+        state.last_total = total
+        # Positive score tiers from the single-result thresholds still count once reached
+        tiers = [name for name in achievements_system(total) if name not in WARNING_TIERS]
+        return self._unlock(state, tiers) + self._run(state, "carbon", entry)
+
+    def on_quiz(self, state, score, total):
+        """One quiz attempt; callers pass each distinct set of answers only once"""
+        state.quizzes += 1
+        state.quiz_best = max(state.quiz_best, score)
+        state.quiz_total = total
+        if total and score == total:
+            state.quiz_perfect += 1
+        return self._run(state, "quiz", {"score": score, "total": total})
+
+    def replay(self, history):
+        """Build state from an existing history once (sessions started before the engine)"""
+        state = AchievementState()
+        for entry in history:
+            self.on_carbon(state, entry)
+        return state
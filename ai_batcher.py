@@ -0,0 +1,129 @@
+"""
+Micro-batching of AI questions across sessions.
+
+Under free-tier quotas (~10 requests/minute) every request is precious.
+``MicroBatcher`` gathers the prompts that arrive within a short window
+(default 500 ms, at most ``max_batch``) from any session, sends them as ONE
+structured multi-question prompt, splits the reply back into per-question
+answers and resolves each caller's future. If an answer can't be found in
+the reply, only that item fails (``BatchParseError``) so the caller can fall
+back for it alone.
+"""
+import queue
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+BATCH_INSTRUCTIONS = (
+    "You will answer {n} independent questions from different students. Each question comes "
+    "with its own context. Answer every question separately and use EXACTLY this format, "
+    "with nothing before the first heading:\n"
+    "### Answer 1\n<answer to question 1>\n### Answer 2\n<answer to question 2>\n..."
+)
+_ANSWER_HEADING = re.compile(r"^\s*#{1,4}\s*Answer\s*(\d+)\s*:?\s*$", re.IGNORECASE | re.MULTILINE)
+_HEADING_LIKE = re.compile(r"^(\s*)#{1,4}(\s*(?:Question|Answer)\b)", re.IGNORECASE | re.MULTILINE)
+
+
+class BatchParseError(Exception):
+    """The batched reply had no usable answer for this question"""
+
+
+def neutralize_headings(text):
+    """Strip the '#'s from lines that look like our section headings, so one
+    visitor's text can't open a section for another visitor's question"""
+    return _HEADING_LIKE.sub(r"\1\2", text)
+
+
+def build_batch_prompt(prompts):
+    sections = [BATCH_INSTRUCTIONS.format(n=len(prompts))]
+    for i, prompt in enumerate(prompts, start=1):
+        sections.append(f"### Question {i}\n{neutralize_headings(prompt)}")
+    return "\n\n".join(sections)
+
+
+def parse_batch_reply(reply, n):
+    """
+    {question_number: answer} for every well-formed answer section. A number
+    whose heading appears more than once is dropped: we can't tell which
+    section is genuine, so that item fails instead of guessing.
+    """
+    sections = {}
+    matches = list(_ANSWER_HEADING.finditer(reply))
+    for idx, match in enumerate(matches):
+        number = int(match.group(1))
+        end = matches[idx + 1].start() if idx + 1 < len(matches) else len(reply)
+        sections.setdefault(number, []).append(reply[match.end():end].strip())
+    return {number: texts[0] for number, texts in sections.items()
+            if 1 <= number <= n and len(texts) == 1 and texts[0]}
+
+
+class MicroBatcher:
+    """
+    ``call_fn(prompt) -> (text, provider_name)`` is the underlying LLM call
+    (e.g. ``HedgedClient.generate``). ``submit`` returns a Future that
+    resolves to ``(answer_text, provider_name)``.
+    """
+
+    def __init__(self, call_fn, window=0.5, max_batch=8, max_concurrent_batches=4):
+        self.call_fn = call_fn
+        self.window = window
+        self.max_batch = max_batch
+        self.stats = {"questions": 0, "batches": 0, "parse_failures": 0}
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrent_batches, thread_name_prefix="ai-batch")
+        threading.Thread(target=self._collect_loop, name="ai-batcher", daemon=True).start()
+
+    def submit(self, prompt: str) -> Future:
+        future = Future()
+        self._queue.put((prompt, future))
+        return future
+
+    def _bump(self, key, amount=1):
+        with self._lock:
+            self.stats[key] += amount
+
+    def _collect_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._executor.submit(self._dispatch, batch)
+
+    def _dispatch(self, batch):
+        batch = [(p, f) for p, f in batch if f.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        self._bump("questions", len(batch))
+        self._bump("batches")
+
+        if len(batch) == 1:
+            prompt, future = batch[0]
+            try:
+                future.set_result(self.call_fn(prompt))
+            except Exception as e:
+                future.set_exception(e)
+            return
+
+        try:
+            reply, provider = self.call_fn(build_batch_prompt([p for p, _ in batch]))
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        answers = parse_batch_reply(reply, len(batch))
+        for number, (_, future) in enumerate(batch, start=1):
+            if number in answers:
+                future.set_result((answers[number], provider))
+            else:
+                self._bump("parse_failures")
+                future.set_exception(BatchParseError(f"No answer {number} in batched reply"))
@@ -0,0 +1,161 @@
+"""
+Background jobs for AI answers and text-to-speech.
+
+Work submitted here runs in a shared worker pool instead of the script
+thread, keyed by session. A rerun (navigation, touching any widget) no
+longer throws the in-flight answer away: the finished job waits in the
+manager until that session's AI page claims it on a later rerun.
+
+Jobs have deadlines and can be cancelled. A running thread can't be
+interrupted, so cancelling or expiring a running job discards its result
+and signals the work to stop: functions submitted with ``pass_job=True``
+get the Job, check ``job.stopped`` / ``job.remaining()`` between steps and
+wait on inner futures with ``job.wait_for(future, timeout)``, which gives up
+as soon as the job stops and cancels the future if it hasn't started yet
+(e.g. a question still queued in the batcher).
+"""
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED, EXPIRED = (
+    "queued", "running", "done", "failed", "cancelled", "expired")
+FINISHED = (DONE, FAILED, CANCELLED, EXPIRED)
+
+
+class Job:
+    """One unit of background work; ``fn`` must not touch st.* APIs"""
+
+    def __init__(self, session_id, kind, deadline_s, meta=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.session_id = session_id
+        self.kind = kind
+        self.meta = meta or {}
+        self.created = time.time()
+        self.deadline = self.created + deadline_s
+        self.finished_at = None
+        self.status = QUEUED
+        self.result = None
+        self.error = None
+        self.future = None
+        self.stopped = threading.Event()  # set on cancel / expiry
+        self._waiting_on = None
+
+    @property
+    def finished(self):
+        return self.status in FINISHED
+
+    def remaining(self):
+        return self.deadline - time.time()
+
+    def wait_for(self, future, timeout):
+        """``future.result(timeout)`` that returns early (TimeoutError / CancelledError) once the job stops"""
+        self._waiting_on = future
+        if self.stopped.is_set():
+            future.cancel()
+        end = time.time() + timeout
+        while not future.done():
+            left = end - time.time()
+            if left <= 0 or self.stopped.wait(min(left, 0.25)):
+                break
+        return future.result(timeout=0)
+
+    def halt(self):
+        self.stopped.set()
+        for future in (self.future, self._waiting_on):
+            if future is not None:
+                future.cancel()
+
+    def seconds_waiting(self):
+        return (self.finished_at or time.time()) - self.created
+
+
+class JobManager:
+    """Shared across all sessions (create it with st.cache_resource)"""
+
+    def __init__(self, max_workers=8, unclaimed_ttl=3600):
+        self.unclaimed_ttl = unclaimed_ttl
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ai-job")
+        self._jobs = {}  # session_id -> {job_id: Job}
+        self._lock = threading.Lock()
+
+    def submit(self, session_id, kind, fn, *args, deadline_s=60.0, meta=None, pass_job=False):
+        """``pass_job``: call ``fn(*args, job=job)`` so it can honour the deadline and cancellation"""
+        job = Job(session_id, kind, deadline_s, meta)
+        with self._lock:
+            self._jobs.setdefault(session_id, {})[job.id] = job
+        kwargs = {"job": job} if pass_job else {}
+        job.future = self._executor.submit(self._run, job, fn, args, kwargs)
+        self._purge_unclaimed()
+        return job
+
+    def _run(self, job, fn, args, kwargs):
+        with self._lock:
+            if job.status != QUEUED:
+                return
+            if time.time() > job.deadline:
+                self._finish(job, EXPIRED)
+                return
+            job.status = RUNNING
+        try:
+            result, error, status = fn(*args, **kwargs), None, DONE
+        except Exception as e:
+            result, error, status = None, e, FAILED
+        with self._lock:
+            if job.status != RUNNING:
+                return  # cancelled or expired while running
+            if time.time() > job.deadline:
+                status, result = EXPIRED, None
+            job.result, job.error = result, error
+            self._finish(job, status)
+
+    def _finish(self, job, status):
+        job.status = status
+        job.finished_at = time.time()
+
+    def jobs(self, session_id, kind=None):
+        """All of a session's jobs (oldest first), expiring overdue ones on the way"""
+        now = time.time()
+        with self._lock:
+            jobs = sorted(self._jobs.get(session_id, {}).values(), key=lambda j: j.created)
+            for job in jobs:
+                if not job.finished and now > job.deadline:
+                    self._finish(job, EXPIRED)
+                    job.halt()
+        return [j for j in jobs if kind is None or j.kind == kind]
+
+    def pending(self, session_id, kind=None):
+        return [j for j in self.jobs(session_id, kind) if not j.finished]
+
+    def claim_finished(self, session_id, kind=None):
+        """Remove and return the session's finished jobs, oldest first"""
+        finished = [j for j in self.jobs(session_id, kind) if j.finished]
+        with self._lock:
+            session_jobs = self._jobs.get(session_id, {})
+            for job in finished:
+                session_jobs.pop(job.id, None)
+            if not session_jobs:
+                self._jobs.pop(session_id, None)
+        return finished
+
+    def cancel(self, session_id, job_id):
+        with self._lock:
+            job = self._jobs.get(session_id, {}).get(job_id)
+            if job is None or job.finished:
+                return False
+            self._finish(job, CANCELLED)
+        job.halt()
+        return True
+
+    def _purge_unclaimed(self):
+        """Drop finished jobs nobody came back for (closed kiosk tabs)"""
+        cutoff = time.time() - self.unclaimed_ttl
+        with self._lock:
+            for session_id in list(self._jobs):
+                session_jobs = self._jobs[session_id]
+                for job_id, job in list(session_jobs.items()):
+                    if job.finished and job.finished_at < cutoff:
+                        del session_jobs[job_id]
+                if not session_jobs:
+                    del self._jobs[session_id]
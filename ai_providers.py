@@ -0,0 +1,235 @@
+"""
+Pluggable LLM provider layer for the Green Energy AI assistant.
+
+Every backend exposes the same tiny interface, ``generate(prompt, timeout)``,
+so the app can talk to Gemini, any OpenAI-compatible endpoint or a local HTTP
+stub (see ``mock_llm_server.py``) without changing the calling code.
+
+``HedgedClient`` wraps an ordered list of providers and issues hedged
+requests: if the primary has not answered within its recent p95 latency, a
+backup request is fired and whichever answers first wins.
+"""
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import numpy as np
+import requests
+
+DEFAULT_PROVIDER_ORDER = ["gemini", "openai", "local"]
+
+
+class ProviderError(Exception):
+    """Raised when a provider returns no usable answer"""
+
+
+# ================================
+# PROVIDERS
+# ================================
+class LLMProvider:
+    """Base class - subclasses implement generate()"""
+    name = "base"
+
+    def generate(self, prompt: str, timeout: float = 30.0) -> str:
+        raise NotImplementedError
+
+
+class GeminiProvider(LLMProvider):
+    name = "gemini"
+
+    def __init__(self, api_key: str, model_name: str):
+        self.api_key = api_key.strip()
+        self.model_name = model_name
+
+    def generate(self, prompt: str, timeout: float = 30.0) -> str:
+        import google.generativeai as genai
+
+        genai.configure(api_key=self.api_key)
+        model = genai.GenerativeModel(self.model_name)
+        resp = model.generate_content(prompt, request_options={"timeout": timeout})
+        text = getattr(resp, "text", None)
+        return text if text else str(resp)
+
+
+class OpenAIProvider(LLMProvider):
+    """Any endpoint speaking the OpenAI chat-completions API"""
+    name = "openai"
+
+    def __init__(self, api_key: str, model_name: str = "gpt-4o-mini", base_url: str = None):
+        self.api_key = api_key.strip()
+        self.model_name = model_name
+        self.base_url = base_url
+        self._client = None
+
+    def _get_client(self):
+        if self._client is None:
+            from openai import OpenAI
+            self._client = OpenAI(api_key=self.api_key, base_url=self.base_url, max_retries=0)
+        return self._client
+
+    def generate(self, prompt: str, timeout: float = 30.0) -> str:
+        resp = self._get_client().chat.completions.create(
+            model=self.model_name,
+            messages=[{"role": "user", "content": prompt}],
+            timeout=timeout,
+        )
+        text = resp.choices[0].message.content if resp.choices else None
+        if not text:
+            raise ProviderError("OpenAI-compatible endpoint returned an empty answer")
+        return text
+
+
+class LocalHTTPProvider(LLMProvider):
+    """Plain JSON stub: POST {"prompt": ...} -> {"text": ...}"""
+    name = "local"
+
+    def __init__(self, url: str):
+        self.url = url.rstrip("/")
+        self._session = requests.Session()
+
+    def generate(self, prompt: str, timeout: float = 30.0) -> str:
+        resp = self._session.post(f"{self.url}/generate", json={"prompt": prompt}, timeout=timeout)
+        if resp.status_code != 200:
+            raise ProviderError(f"{resp.status_code} from local LLM stub: {resp.text[:200]}")
+        text = resp.json().get("text")
+        if not text:
+            raise ProviderError("Local LLM stub returned an empty answer")
+        return text
+
+
+def build_providers(secrets, gemini_models=None):
+    """
+    Build the ordered provider list from a secrets-like mapping.
+    Only providers with credentials/URLs present are returned.
+    """
+    gemini_models = gemini_models or []
+    order = secrets.get("LLM_PROVIDERS") or DEFAULT_PROVIDER_ORDER
+    if isinstance(order, str):
+        order = [p.strip().lower() for p in order.split(",") if p.strip()]
+
+    providers = []
+    for name in order:
+        if name == "gemini":
+            key = secrets.get("GEMINI_API_KEY")
+            if key and key.strip() and gemini_models:
+                providers.append(GeminiProvider(key, gemini_models[0]))
+        elif name == "openai":
+            key = secrets.get("OPENAI_API_KEY")
+            if key and key.strip():
+                providers.append(OpenAIProvider(
+                    key,
+                    model_name=secrets.get("OPENAI_MODEL") or "gpt-4o-mini",
+                    base_url=secrets.get("OPENAI_BASE_URL") or None,
+                ))
+        elif name == "local":
+            url = secrets.get("LOCAL_LLM_URL")
+            if url:
+                providers.append(LocalHTTPProvider(url))
+    return providers
+
+
+# ================================
+# HEDGED REQUESTS
+# ================================
+class LatencyTracker:
+    """Rolling window of successful request latencies (seconds)"""
+
+    def __init__(self, window: int = 200, min_samples: int = 10, default_delay: float = 2.0):
+        self.samples = deque(maxlen=window)
+        self.min_samples = min_samples
+        self.default_delay = default_delay
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self.samples.append(seconds)
+
+    def percentile(self, q: float) -> float:
+        with self._lock:
+            if len(self.samples) < self.min_samples:
+                return self.default_delay
+            return float(np.percentile(list(self.samples), q))
+
+
+class HedgedClient:
+    """
+    Sends the prompt to the primary provider and, if it hasn't answered after
+    its p95 latency, fires a backup request (next provider, or the same one
+    when ``hedge_same_provider`` is set). The first successful answer wins;
+    the slower request is left to finish in the background.
+    """
+
+    def __init__(self, providers, hedge_same_provider: bool = False,
+                 min_delay: float = 0.2, max_delay: float = 10.0, max_workers: int = 16):
+        if not providers:
+            raise ValueError("HedgedClient needs at least one provider")
+        self.providers = list(providers)
+        self.hedge_same_provider = hedge_same_provider
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.trackers = {p.name: LatencyTracker() for p in self.providers}
+        self.stats = {"requests": 0, "hedged": 0, "backup_wins": 0}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm")
+        self._lock = threading.Lock()
+
+    @property
+    def primary(self):
+        return self.providers[0]
+
+    @property
+    def backup(self):
+        if len(self.providers) > 1:
+            return self.providers[1]
+        return self.primary if self.hedge_same_provider else None
+
+    def hedge_delay(self) -> float:
+        p95 = self.trackers[self.primary.name].percentile(95)
+        return min(max(p95, self.min_delay), self.max_delay)
+
+    def _call(self, provider, prompt, timeout):
+        start = time.perf_counter()
+        text = provider.generate(prompt, timeout=timeout)
+        self.trackers[provider.name].record(time.perf_counter() - start)
+        return text, provider.name
+
+    def _bump(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def generate(self, prompt: str, timeout: float = 30.0):
+        """Returns (text, provider_name). Raises the primary's error if every request fails."""
+        self._bump("requests")
+        deadline = time.monotonic() + timeout
+        primary = self._executor.submit(self._call, self.primary, prompt, timeout)
+        done, _ = wait([primary], timeout=min(self.hedge_delay(), timeout))
+        if done and primary.exception() is None:
+            return primary.result()
+
+        backup_provider = self.backup
+        if backup_provider is None:
+            done, _ = wait([primary], timeout=max(deadline - time.monotonic(), 0))
+            if not done:
+                raise TimeoutError(f"No LLM provider answered within {timeout:.0f}s")
+            return primary.result()
+
+        # Primary is slow (hedge) or already failed (failover)
+        self._bump("hedged")
+        backup = self._executor.submit(self._call, backup_provider, prompt, timeout)
+        pending = {primary, backup}
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for fut in done:
+                if fut.exception() is None:
+                    if fut is backup:
+                        self._bump("backup_wins")
+                    return fut.result()
+
+        if primary.done() and primary.exception() is not None:
+            raise primary.exception()
+        if backup.done() and backup.exception() is not None:
+            raise backup.exception()
+        raise TimeoutError(f"No LLM provider answered within {timeout:.0f}s")
@@ -3,13 +3,27 @@ import google.generativeai as genai
 import matplotlib.pyplot as plt
 import pandas as pd
 from gtts import gTTS
-from io import BytesIO
+from io import BytesIO, StringIO
 from datetime import datetime, timedelta
 import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
 import time
 import re
+import hashlib
+import csv
+from ai_providers import HedgedClient, build_providers
+from ai_batcher import BatchParseError, MicroBatcher
+from session_store import SessionStateManager, current_session, resolve
+from carbon_model import TRANSPORT_FACTORS, FOOD_FACTORS, achievements_system, carbon_badge, footprint_breakdown
+from reduction_plan import best_plan
+from grid_solar import LOCATIONS, appliance_emissions, configure as configure_profiles, solar_offset
+from certificates import RosterError, certificate_record, read_roster, render_batch, render_certificate
+from conversation import ConversationMemory
+from voice_input import build_recognizer, transcribe_audio
+from ai_jobs import JobManager, DONE, FAILED, EXPIRED
+from sync_log import SyncLog
+from achievements import AchievementEngine
 
 # ================================
 # PAGE CONFIGURATION
@@ -338,11 +352,19 @@ def update_rate_limit():
 # ================================
 # GEMINI API SETUP - GEMINI-2.5-FLASH PRIMARY
 # ================================
+def get_secret(name, default=None):
+    """st.secrets.get that also works when no secrets.toml exists"""
+    try:
+        return st.secrets.get(name, default)
+    except FileNotFoundError:
+        return default
+
+
 @st.cache_data(ttl=600)
 def setup_gemini_api():
     """Zero-error API setup with detailed status and quota detection"""
     try:
-        GEMINI_KEY = st.secrets.get("GEMINI_API_KEY")
+        GEMINI_KEY = get_secret("GEMINI_API_KEY")
         if not GEMINI_KEY or GEMINI_KEY.strip() == "":
             return {"status": "🔑 MISSING", "models": [], "error": "No API key found"}
 
@@ -381,63 +403,88 @@ API_STATUS = API_INFO.get("status", "❌ UNKNOWN")
 AVAILABLE_MODELS = API_INFO.get("models", [])
 API_ERROR = API_INFO.get("error", "")
 
+
+class _SecretsView:
+    """Plain mapping view of st.secrets for build_providers"""
+    def get(self, name, default=None):
+        return get_secret(name, default)
+
+
+@st.cache_resource
+def get_ai_client():
+    """Shared hedged client across all sessions (keeps p95 latency stats warm)"""
+    providers = build_providers(_SecretsView(), AVAILABLE_MODELS)
+    if not providers:
+        return None
+    hedge_same = str(get_secret("AI_HEDGE_SAME_PROVIDER", "false")).lower() == "true"
+    return HedgedClient(providers, hedge_same_provider=hedge_same)
+
+
+AI_CLIENT = get_ai_client()
+
+
+@st.cache_resource
+def get_ai_batcher():
+    """Groups questions from all sessions arriving within a short window into one request"""
+    if AI_CLIENT is None:
+        return None
+    return MicroBatcher(
+        AI_CLIENT.generate,
+        window=float(get_secret("AI_BATCH_WINDOW", 0.5)),
+        max_batch=int(get_secret("AI_BATCH_MAX", 8)),
+    )
+
+
+AI_BATCHER = get_ai_batcher()
+
+# ================================
+# KIOSK SYNC LOG
+# ================================
+@st.cache_resource
+def get_sync_log():
+    """This kiosk's append-only event log, merged with other kiosks' batches on sync"""
+    return SyncLog(get_secret("SYNC_DIR", "kiosk_data"), node_id=get_secret("KIOSK_ID"))
+
+
+SYNC_LOG = get_sync_log()
+SYNC_SHARED_DIR = get_secret("SYNC_SHARED_DIR")
+
+
+def record_event(kind, data):
+    """Log a visitor event for cross-kiosk stats; never let logging break the page"""
+    try:
+        SYNC_LOG.append(kind, data, session=SESSION_ID)
+    except OSError as e:
+        st.toast(f"Couldn't write kiosk log: {e}")
+
 # ================================
 # UTILITY FUNCTIONS
 # ================================
+def text_to_mp3(text) -> bytes:
+    """gTTS to MP3 bytes (no st calls, so it can run as a background job)"""
+    buffer = BytesIO()
+    gTTS(text[:500]).write_to_fp(buffer)
+    return buffer.getvalue()
+
+
 def text_to_audio(text):
     """Convert text to speech with error handling"""
     try:
-        tts = gTTS(text[:500])
-        buffer = BytesIO()
-        tts.write_to_fp(buffer)
-        buffer.seek(0)
-        st.audio(buffer, format="audio/mp3")
+        st.audio(text_to_mp3(text), format="audio/mp3")
     except Exception as e:
         st.error(f"Audio generation failed: {str(e)}")
 
 
-def carbon_badge(score):
-    if score < 6:
-        return "🟢🌟 *Eco Champion* - World Class!"
-    elif score < 10:
-        return "🟢 *Eco Friendly* - Excellent!"
-    elif score < 15:
-        return "🟡 *Moderate* - Room to Improve"
-    else:
-        return "🔴⚠️ *High Impact* - Urgent Action Needed!"
-
+@st.cache_data(max_entries=1000, show_spinner=False)
+def cached_reduction_plan(inputs, max_effort, max_cost):
+    """Optimised action plan, cached per calculator input vector and budget"""
+    return best_plan(dict(inputs), max_effort=max_effort, max_cost=max_cost)
 
-def achievements_system(score):
-    achievements = []
-    if score < 6:
-        achievements.extend(["🌟 Eco-Starter Elite", "🏆 Global Green Leader"])
-    elif score < 10:
-        achievements.extend(["💚 Green Lifestyle Pro", "⭐ Sustainable Star"])
-    elif score < 15:
-        achievements.extend(["🔥 Carbon Warrior", "📈 Improvement Needed"])
-    else:
-        achievements.extend(["⚠️ High Alert", "🎯 Target for Change"])
-    return achievements
 
-
-def personalized_recommendations(total, transport, electricity, food):
-    tips = []
-
-    if transport > total * 0.3:
-        tips.append("🚗 **Transport (High):** Switch to carpooling or electric vehicle")
-    if electricity > total * 0.25:
-        tips.append("💡 **Electricity (High):** Use 5-star appliances & LEDs")
-    if food > 4:
-        tips.append("🍽 **Diet:** Try 2 vegetarian days per week")
-
-    tips.extend([
-        "🌱 Plant a tree this month",
-        "♻️ Segregate waste daily",
-        "💧 Fix leaking taps",
-        "🔌 Unplug standby electronics"
-    ])
-
-    return tips[:4]
+@st.cache_data(max_entries=500, show_spinner=False)
+def cached_certificate(record, fmt):
+    """Certificates only change when the record does, so don't re-render every rerun"""
+    return render_certificate(record, fmt)
 
 
 def india_comparison(total):
@@ -449,9 +496,17 @@ def india_comparison(total):
     else:
         return f"📊 Above Indian avg ({total:.1f} vs {avg_indian:.1f}). Room to improve!"
 
+@st.cache_resource
+def get_speech_recognizer():
+    """'google' (default) or 'stub' for offline demos/tests"""
+    return build_recognizer(get_secret("SPEECH_RECOGNIZER", "google"), get_secret("SPEECH_LANGUAGE", "en-IN"))
+
 # ================================
 # CANNED AI RESPONSES
 # ================================
+if get_secret("PROFILE_DIR"):
+    configure_profiles(get_secret("PROFILE_DIR"))  # e.g. a writable volume on read-only deploys
+
 CANNED_RESPONSES = {
     "solar": "For rooftop solar in India: check orientation (south), get a 3-5kW system for a household, and apply for net metering through your DISCOM.",
     "electricity": "Reducing electricity: use LED bulbs, switch off standby power, and use fans with high star ratings. Consider time-of-day usage to avoid peak tariffs.",
@@ -465,72 +520,100 @@ def canned_ai_reply(user_input: str) -> str:
     ui = user_input.lower()
     for k in CANNED_RESPONSES:
         if k in ui:
+            if k == "solar":
+                return " ".join(filter(None, [CANNED_RESPONSES[k], solar_estimate(ui)]))
             return CANNED_RESPONSES[k]
     return CANNED_RESPONSES["default"]
 
+
+def solar_estimate(text: str, kw: float = 3.0) -> str:
+    """Numbers for the canned solar answer from the hourly simulation (city named in the question, else Delhi)"""
+    location = next((loc for loc in LOCATIONS if loc.lower() in text), "Delhi")
+    try:
+        pv = solar_offset(location, kw)
+    except (OSError, ValueError):
+        return ""  # last-resort fallback: never fail on profile I/O
+    return (f"In {location} a {kw:g} kW system makes about {pv['annual_kwh']:,.0f} kWh a year "
+            f"(~{pv['annual_kwh'] / 12:,.0f} units a month) and avoids about {pv['kg_per_year']:,.0f} kg of CO₂.")
+
 # ================================
 # ROBUST AI GENERATION
 # ================================
+def get_conversation():
+    """This session's chat memory (rolling summary + recent turns)"""
+    if "ai_chat" not in st.session_state:
+        st.session_state["ai_chat"] = ConversationMemory()
+    return st.session_state["ai_chat"]
 
-def generate_ai_response(user_input: str, use_offline: bool = False, max_retries: int = 3):
+
+def record_ai_turn(question: str, answer: str):
+    get_conversation().add_turn(question, answer)
+    record_event("ai", {"question": question, "answer": answer})
+
+
+def prepare_ai_request(user_input: str, use_offline: bool = False):
     """
-    Returns (response_text, used_offline_flag)
-    Tries Gemini API if available; falls back to canned replies if quota/error.
+    Script-thread half of an AI request: offline/rate-limit/availability checks
+    and prompt building. Returns (prompt, None) when the request should go to
+    the AI, or (None, (response_text, used_offline)) when it's answered already.
     """
     if use_offline:
-        return canned_ai_reply(user_input), True
+        return None, (canned_ai_reply(user_input), True)
 
     can_proceed, wait_time = check_rate_limit()
     if not can_proceed:
         msg = f"⏳ Rate limit protection active. Please wait {wait_time:.1f} seconds before next request.\n\n{canned_ai_reply(user_input)}"
-        return msg, True
+        return None, (msg, True)
 
-    GEMINI_KEY = st.secrets.get("GEMINI_API_KEY", None)
-    if not GEMINI_KEY:
-        return "🔑 Gemini API key missing. Enable the key in Streamlit secrets or toggle 'Use offline AI'.", True
+    if AI_BATCHER is None:
+        if not get_secret("GEMINI_API_KEY"):
+            return None, ("🔑 Gemini API key missing. Enable the key in Streamlit secrets or toggle 'Use offline AI'.", True)
+        if API_STATUS and re.search(r"QUOTA|429|NO MODELS|MISSING", API_STATUS, re.IGNORECASE):
+            fallback = f"⚠️ Gemini API unavailable: {API_STATUS}. Details: {API_ERROR}\n\nSwitching to offline assistant.\n\n{canned_ai_reply(user_input)}"
+            return None, (fallback, True)
+        return None, (f"⚠️ No AI providers available. Using offline assistant.\n\n{canned_ai_reply(user_input)}", True)
 
-    if API_STATUS and re.search(r"QUOTA|429|NO MODELS|MISSING", API_STATUS, re.IGNORECASE):
-        fallback = f"⚠️ Gemini API unavailable: {API_STATUS}. Details: {API_ERROR}\n\nSwitching to offline assistant.\n\n{canned_ai_reply(user_input)}"
-        return fallback, True
+    update_rate_limit()
+    return get_conversation().build_prompt(user_input, full_history()), None
 
-    if not AVAILABLE_MODELS:
-        return f"⚠️ No Gemini models available. Using offline assistant.\n\n{canned_ai_reply(user_input)}", True
-    
-    model_name = AVAILABLE_MODELS[0]
 
+def run_ai_request(user_input: str, prompt: str, max_retries: int = 3, job=None):
+    """
+    Returns (response_text, used_offline_flag, provider_name). Makes no st
+    calls, so it runs in the background job pool as well as inline.
+    Tries the configured AI providers (Gemini / OpenAI-compatible / local stub)
+    with hedged requests; falls back to canned replies if quota/error.
+    As a background ``job`` it stops waiting and retrying at the job's
+    deadline or when the visitor cancels, so dead jobs don't spend quota.
+    """
     delay = 1.0
     for attempt in range(1, max_retries + 1):
+        timeout = 60 if job is None else min(60, job.remaining())
+        if timeout <= 0 or (job is not None and job.stopped.is_set()):
+            break
+        future = AI_BATCHER.submit(prompt)
         try:
-            genai.configure(api_key=GEMINI_KEY.strip())
-            model = genai.GenerativeModel(model_name)
-
-            prompt_context = "You are a concise, practical assistant helping students reduce their carbon footprint in India. Reply in simple, actionable steps."
-            if st.session_state.get("history") and len(st.session_state["history"]) > 0:
-                latest = st.session_state["history"][-1]
-                latest_total = latest.get("total", 0)
-                prompt_context += f" Latest recorded CO2: {latest_total:.1f} kg/day."
-
-            full_prompt = f"{prompt_context}\n\nQuestion: {user_input}"
+            if job is None:
+                text, provider_name = future.result(timeout=timeout)
+            else:
+                text, provider_name = job.wait_for(future, timeout)
+            return text, False, provider_name
 
-            resp = model.generate_content(full_prompt)
-            text = getattr(resp, 'text', None)
-            if not text:
-                text = str(resp)
-            
-            update_rate_limit()
-            return text, False
+        except BatchParseError:
+            return f"⚠️ Couldn't read the AI's answer this time. Using offline assistant.\n\n{canned_ai_reply(user_input)}", True, None
 
         except Exception as e:
+            future.cancel()  # still queued in the batcher: don't send it
             err = str(e)
             if re.search(r"quota|Quota exceeded|429|rate limit|GenerateRequestsPerMinute", err, re.IGNORECASE):
                 fallback_msg = (
-                    "⚠️ Gemini quota / rate-limit detected.\n\n"
+                    "⚠️ AI quota / rate-limit detected.\n\n"
                     "Switching to offline/canned assistant. To fix: check Google Cloud billing, "
                     "request higher quota, or use a different API key.\n"
                     "See: https://ai.google.dev/gemini-api/docs/rate-limits\n\n"
                     + canned_ai_reply(user_input)
                 )
-                return fallback_msg, True
+                return fallback_msg, True, None
 
             if attempt == max_retries:
                 fallback = (
@@ -538,13 +621,57 @@ def generate_ai_response(user_input: str, use_offline: bool = False, max_retries
                     f"Using offline assistant.\n\n"
                     f"{canned_ai_reply(user_input)}"
                 )
-                return fallback, True
-            else:
+                return fallback, True, None
+            if job is None:
                 time.sleep(delay)
-                delay *= 2.0
-                continue
+            elif job.remaining() <= delay or job.stopped.wait(delay):
+                break  # no time for another attempt, or cancelled
+            delay *= 2.0
 
-    return f"⚠️ Unexpected error. Using offline assistant.\n\n{canned_ai_reply(user_input)}", True
+    return f"⚠️ The AI took too long. Using offline assistant.\n\n{canned_ai_reply(user_input)}", True, None
+
+
+def generate_ai_response(user_input: str, use_offline: bool = False, max_retries: int = 3):
+    """Returns (response_text, used_offline_flag), blocking the script until answered"""
+    prompt, answered = prepare_ai_request(user_input, use_offline)
+    if answered is not None:
+        return answered
+    text, used_offline, provider_name = run_ai_request(user_input, prompt, max_retries)
+    if provider_name:
+        st.session_state["last_ai_provider"] = provider_name
+    return text, used_offline
+
+
+@st.cache_resource
+def get_job_manager():
+    """Shared worker pool for AI answers and speech, so they survive reruns and navigation"""
+    return JobManager(max_workers=int(get_secret("AI_JOB_WORKERS", 8)))
+
+
+AI_JOBS = get_job_manager()
+AI_JOB_DEADLINE = float(get_secret("AI_JOB_DEADLINE", 90))
+
+
+def collect_ai_jobs():
+    """Move this session's finished AI/TTS jobs into the conversation and session state"""
+    if SESSION_ID is None:
+        return
+    for job in AI_JOBS.claim_finished(SESSION_ID, "ai"):
+        question = job.meta["question"]
+        if job.status == DONE:
+            text, used_offline, provider_name = job.result
+            if provider_name:
+                st.session_state["last_ai_provider"] = provider_name
+        elif job.status in (FAILED, EXPIRED):
+            text = f"⚠️ The AI took too long or failed. Using offline assistant.\n\n{canned_ai_reply(question)}"
+        else:
+            continue  # cancelled by the user
+        record_ai_turn(question, text)
+    for job in AI_JOBS.claim_finished(SESSION_ID, "tts"):
+        if job.status == DONE:
+            st.session_state["tts_audio"] = job.result
+        elif job.status in (FAILED, EXPIRED):
+            st.session_state["tts_error"] = str(job.error or "timed out")
 
 # ================================
 # SESSION STATE INITIALIZATION
@@ -564,6 +691,51 @@ for key, default in session_init.items():
     if key not in st.session_state:
         st.session_state[key] = default
 
+# ================================
+# SESSION MEMORY BUDGET
+# ================================
+@st.cache_resource
+def get_session_manager():
+    """One manager for all sessions: byte cap, idle spill to disk, lazy restore"""
+    return SessionStateManager(
+        spill_dir=get_secret("SESSION_SPILL_DIR"),
+        spill_keys=("history", "quiz_answers", "ai_chat"),
+        max_bytes=int(get_secret("SESSION_MAX_BYTES", 2_000_000)),
+        idle_seconds=float(get_secret("SESSION_IDLE_SECONDS", 600)),
+    )
+
+
+SESSION_MANAGER = get_session_manager()
+SESSION_ID, _SESSION_STATE = current_session()
+if SESSION_ID is not None:
+    SESSION_MANAGER.on_rerun(SESSION_ID, _SESSION_STATE)
+
+
+def full_history():
+    """Compacted (on-disk) history entries followed by the in-memory ones"""
+    archived = SESSION_MANAGER.archived(SESSION_ID, "history") if SESSION_ID else []
+    return archived + st.session_state["history"]
+
+
+ACHIEVEMENTS = AchievementEngine()
+
+
+def get_achievement_state():
+    """Running achievement counters; built from the history once, then updated per event"""
+    if "achievement_state" not in st.session_state:
+        st.session_state["achievement_state"] = ACHIEVEMENTS.replay(full_history())
+        st.session_state["achievements_unlocked"] = list(st.session_state["achievement_state"].unlocked)
+    return st.session_state["achievement_state"]
+
+
+def unlock_achievements(event, *args):
+    """Feed one event to the engine; returns the newly unlocked achievement names"""
+    state = get_achievement_state()
+    handler = ACHIEVEMENTS.on_carbon if event == "carbon" else ACHIEVEMENTS.on_quiz
+    new = handler(state, *args)
+    st.session_state["achievements_unlocked"] = list(state.unlocked)
+    return new
+
 # ================================
 # SIDEBAR NAVIGATION
 # ================================
@@ -601,6 +773,17 @@ with st.sidebar:
         st.caption(f"Model: {AVAILABLE_MODELS[0]}")
     else:
         st.caption(API_ERROR if API_ERROR else "Setup needed")
+    if AI_CLIENT is not None:
+        st.caption("Providers: " + " → ".join(p.name for p in AI_CLIENT.providers))
+    if AI_BATCHER is not None and AI_BATCHER.stats["batches"]:
+        st.caption(f"Batching: {AI_BATCHER.stats['questions']} questions in {AI_BATCHER.stats['batches']} requests")
+    if SESSION_ID is not None:
+        st.caption(f"Session memory: {SESSION_MANAGER.session_bytes(SESSION_ID) / 1024:.1f} KB")
+        waiting = AI_JOBS.pending(SESSION_ID, "ai")
+        if waiting:
+            st.caption(f"🤖 {len(waiting)} AI question(s) in progress")
+        elif any(j.status == DONE for j in AI_JOBS.jobs(SESSION_ID, "ai")):
+            st.caption("🤖 Your AI answer is ready")
 
 # ================================
 # PAGE ROUTING
@@ -648,7 +831,7 @@ if page == "Home":
     with col3:
         st.markdown(f"""
             <div class="metric-display">
-                <div class="metric-value">{len(st.session_state['history'])}</div>
+                <div class="metric-value">{len(full_history())}</div>
                 <div style="color: #aaa;">Calculations</div>
             </div>
         """, unsafe_allow_html=True)
@@ -660,23 +843,17 @@ elif page == "Carbon":
         with col1:
             st.subheader("🚗 Transportation")
             km_daily = st.slider("Daily Travel (km)", 0, 200, 12, help="Your daily commute")
-            fuel_type = st.selectbox("Fuel Type", ["Petrol", "Diesel", "Electric", "CNG"])
-            transport_factor = {"Petrol": 0.118, "Diesel": 0.134, "Electric": 0.02, "CNG": 0.08}
-            transport_co2 = km_daily * transport_factor[fuel_type]
+            fuel_type = st.selectbox("Fuel Type", list(TRANSPORT_FACTORS))
 
             st.subheader("💡 Electricity")
             kwh_monthly = st.number_input("Monthly Units", 0, 2000, 150)
-            electricity_co2 = (kwh_monthly * 0.82) / 30
 
         with col2:
             st.subheader("🔥 Cooking Gas")
             lpg_cylinders = st.slider("LPG Cylinders/Year", 0, 24, 6)
-            lpg_co2 = (lpg_cylinders * 42.5) / 365
 
             st.subheader("🍽️ Food Habits")
-            diet_type = st.selectbox("Diet", ["Vegetarian", "Eggetarian", "Chicken", "Fish", "Mixed Non-Veg"])
-            food_factors = {"Vegetarian": 2.0, "Eggetarian": 3.0, "Chicken": 4.5, "Fish": 5.5, "Mixed Non-Veg": 6.5}
-            food_co2 = food_factors[diet_type]
+            diet_type = st.selectbox("Diet", list(FOOD_FACTORS))
 
             st.subheader("❄️ Appliances")
             ac_hours = st.slider("AC Hours/Day", 0, 24, 2)
@@ -691,21 +868,26 @@ elif page == "Carbon":
         calculate_btn = st.form_submit_button("🚀 Calculate Full Footprint", use_container_width=True)
 
     if calculate_btn:
-        ac_co2 = ac_hours * 1.5 * 0.82
-        geyser_co2 = geyser_hours * 2 * 0.82
-        waste_co2 = waste_kg * 0.09
-        water_co2 = water_usage * 0.0005
-
-        total_co2 = (transport_co2 + electricity_co2 + lpg_co2 + ac_co2 + 
-                    geyser_co2 + waste_co2 + food_co2 + water_co2)
-
-        st.session_state["history"].append({
+        inputs = {"km_daily": km_daily, "fuel_type": fuel_type, "kwh_monthly": kwh_monthly,
+                  "lpg_cylinders": lpg_cylinders, "diet_type": diet_type, "ac_hours": ac_hours,
+                  "geyser_hours": geyser_hours, "waste_kg": waste_kg, "water_usage": water_usage}
+        st.session_state["last_inputs"] = inputs
+        breakdown = footprint_breakdown(**inputs)
+        transport_co2, electricity_co2, food_co2 = breakdown["transport"], breakdown["electricity"], breakdown["food"]
+        total_co2 = sum(breakdown.values())
+
+        get_achievement_state()  # replay earlier history before adding this entry
+        entry = {
             "time": datetime.now(),
             "total": total_co2,
             "transport": transport_co2,
             "electricity": electricity_co2,
             "food": food_co2
-        })
+        }
+        st.session_state["history"].append(entry)
+        new_achievements = unlock_achievements("carbon", entry)
+        record_event("carbon", {"total": total_co2, "transport": transport_co2,
+                                "electricity": electricity_co2, "food": food_co2})
 
         st.markdown(f"""
             <div class="metric-display pulse-glow">
@@ -717,31 +899,93 @@ elif page == "Carbon":
         st.markdown(f'<div class="success-badge">{carbon_badge(total_co2)}</div>', unsafe_allow_html=True)
 
         st.subheader("🏆 Achievements Unlocked")
-        new_achievements = achievements_system(total_co2)
+        achievement_state = get_achievement_state()
+        tiers = achievements_system(total_co2)  # this result only; warnings aren't kept
+        for ach in tiers:
+            st.success(f"🔓 New: {ach}" if ach in new_achievements else f"✅ {ach}")
         for ach in new_achievements:
-            st.success(f"✅ {ach}")
+            if ach not in tiers:
+                st.success(f"🔓 New: {ach}")
+        if not new_achievements:
+            st.caption("No new achievements this time - lower your footprint to keep your streak going!")
+        if achievement_state.streak:
+            st.info(f"📉 Improvement streak: {achievement_state.streak} in a row")
+        elif achievement_state.new_best and achievement_state.entries > 1:
+            st.info("🥇 New personal best!")
 
         st.info(india_comparison(total_co2))
 
         labels = ["Transport", "Electricity", "Food", "LPG", "AC", "Geyser", "Waste", "Water"]
-        values = [transport_co2, electricity_co2, food_co2, lpg_co2, ac_co2, geyser_co2, waste_co2, water_co2]
+        values = list(breakdown.values())
 
         fig = px.pie(values=values, names=labels, title="Your Carbon Breakdown")
         fig.update_traces(textposition='inside', textinfo='percent+label')
         fig.update_layout(showlegend=False)
         st.plotly_chart(fig, use_container_width=True)
 
+    if "last_inputs" in st.session_state:
         st.subheader("🎯 Personalized Action Plan")
-        tips = personalized_recommendations(total_co2, transport_co2, electricity_co2, food_co2)
-        for tip in tips:
-            st.markdown(f"• **{tip}**")
+        col1, col2 = st.columns(2)
+        with col1:
+            max_effort = st.slider("How much effort can you put in?", 2, 15, 6, key="plan_effort",
+                                   help="Effort points: 1 = a habit tweak, 5 = a big change")
+        with col2:
+            budgets = {"Free only": 0, "Up to ₹5,000": 5_000, "Up to ₹50,000": 50_000, "Up to ₹1.5 lakh": 150_000}
+            budget = st.selectbox("Budget", list(budgets), index=1, key="plan_budget")
+        plan = cached_reduction_plan(tuple(st.session_state["last_inputs"].items()), max_effort, budgets[budget])
+        if not plan["actions"]:
+            st.success("🌟 Your footprint is already lean - nothing left to cut within this budget!")
+        for action in plan["actions"]:
+            cost = "free" if action["cost"] == 0 else f"~₹{action['cost']:,}"
+            st.markdown(f"• **{action['label']}** - saves **{action['saving']:.2f} kg CO₂/day** "
+                        f"(effort {action['effort']}, {cost})")
+        if plan["actions"]:
+            st.info(f"📉 Together: {plan['baseline']:.2f} → {plan['new_total']:.2f} kg CO₂/day "
+                    f"({plan['saving'] / plan['baseline']:.0%} less, {plan['saving'] * 365:.0f} kg a year)")
+
+        with st.expander("🔬 Simulation mode: hourly grid & rooftop solar"):
+            st.caption("Uses hour-by-hour grid carbon intensity for your region and a full year of "
+                       "solar output instead of the flat 0.82 kg/kWh.")
+            last = st.session_state["last_inputs"]
+            col1, col2 = st.columns(2)
+            with col1:
+                location = st.selectbox("Location", list(LOCATIONS), key="sim_location")
+            with col2:
+                solar_kw = st.slider("Rooftop solar (kW)", 0.0, 10.0, 3.0, 0.5, key="sim_solar_kw")
+            start = time.perf_counter()
+            try:
+                pv = solar_offset(location, solar_kw)
+                use = appliance_emissions(pv["region"], last["ac_hours"], last["geyser_hours"])
+            except (OSError, ValueError) as e:
+                st.warning(f"⚠️ Simulation unavailable: couldn't load the hourly profiles ({e}).")
+            else:
+                elapsed_ms = (time.perf_counter() - start) * 1000
+
+                col1, col2, col3 = st.columns(3)
+                col1.metric("❄️ AC (time-of-use)", f"{use['ac_tou']:.2f} kg/day",
+                            f"{use['ac_tou'] - use['ac_flat']:+.2f} vs flat", delta_color="inverse")
+                col2.metric("🚿 Geyser (time-of-use)", f"{use['geyser_tou']:.2f} kg/day",
+                            f"{use['geyser_tou'] - use['geyser_flat']:+.2f} vs flat", delta_color="inverse")
+                col3.metric("☀️ Solar offset", f"{pv['kg_per_day']:.2f} kg/day",
+                            f"{pv['annual_kwh']:,.0f} kWh/yr", delta_color="off")
+                if solar_kw:
+                    covered = pv["annual_kwh"] / max(last["kwh_monthly"] * 12, 1)
+                    st.info(f"☀️ A {solar_kw:g} kW system in {location} ({pv['region']} grid) would cover "
+                            f"{min(covered, 1):.0%} of your {last['kwh_monthly']} monthly units, with a capacity "
+                            f"factor of {pv['capacity_factor']:.1%}.")
+                    months = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+                    fig_pv = px.bar(x=months, y=pv["monthly_kwh"], title="Monthly Solar Generation",
+                                    labels={"x": "Month", "y": "kWh"})
+                    st.plotly_chart(fig_pv, use_container_width=True)
+                st.caption(f"Simulated 8,760 hours in {elapsed_ms:.1f} ms")
 
 elif page == "History":
     st.markdown('<div class="mega-header">📊 Your Carbon Journey</div>', unsafe_allow_html=True)
-    if not st.session_state["history"] or len(st.session_state["history"]) == 0:
+    history = full_history()
+    if not history:
         st.info("👆 Calculate your first footprint to see your progress!")
     else:
-        df = pd.DataFrame(st.session_state["history"])
+        df = pd.DataFrame(history)
         df['date'] = pd.to_datetime(df['time']).dt.date
 
         col1, col2 = st.columns(2)
@@ -756,10 +1000,64 @@ elif page == "History":
             st.metric("📈 Average Daily", f"{avg_co2:.2f} kg")
             st.metric("🥇 Best Day", f"{best_day:.2f} kg")
             st.metric("📊 Total Entries", len(df))
+            all_carbon = SYNC_LOG.frame("carbon")
+            if len(all_carbon) > len(df):
+                st.caption(f"🌐 All kiosks average: {all_carbon['total'].mean():.2f} kg "
+                           f"over {all_carbon['session'].nunique()} visitors")
 
         st.subheader("Recent Calculations")
         st.dataframe(df[['time', 'total']].tail(10), use_container_width=True)
 
+        st.subheader("🏆 Achievements")
+        achievement_state = get_achievement_state()
+        col1, col2, col3 = st.columns(3)
+        col1.metric("📉 Current Streak", achievement_state.streak)
+        col2.metric("🔥 Longest Streak", achievement_state.best_streak)
+        col3.metric("🧠 Best Quiz", f"{achievement_state.quiz_best}/{achievement_state.quiz_total}"
+                    if achievement_state.quizzes else "-")
+        if st.session_state["achievements_unlocked"]:
+            st.markdown(" ".join(f"`{a}`" for a in st.session_state["achievements_unlocked"]))
+
+        st.subheader("🎓 Your Certificate")
+        if not st.session_state["user_name"].strip():
+            st.info("Enter your name in the sidebar profile to personalise your certificate.")
+        else:
+            record = certificate_record(
+                st.session_state["user_name"],
+                history[-1]["total"],
+                quiz_score=st.session_state["quiz_score"],
+                achievements=st.session_state["achievements_unlocked"][-4:] or None,
+            )
+            col1, col2 = st.columns(2)
+            with col1:
+                st.download_button("🖼️ Download PNG", cached_certificate(record, "png"),
+                                   file_name="green_certificate.png", mime="image/png",
+                                   use_container_width=True)
+            with col2:
+                st.download_button("📄 Download PDF", cached_certificate(record, "pdf"),
+                                   file_name="green_certificate.pdf", mime="application/pdf",
+                                   use_container_width=True)
+
+    with st.expander("🏫 Class / School Certificates (batch)"):
+        st.caption("Upload a CSV with columns: name, total_co2, quiz_score (optional: quiz_total, achievements, date)")
+        roster_file = st.file_uploader("Roster CSV", type=["csv"], key="cert_roster")
+        cert_format = st.radio("Format", ["png", "pdf"], horizontal=True, key="cert_format")
+        if roster_file is not None and st.button("🎓 Generate All Certificates"):
+            try:
+                roster, skipped = read_roster(StringIO(roster_file.getvalue().decode("utf-8-sig")))
+            except (RosterError, UnicodeDecodeError, csv.Error) as e:
+                roster, skipped = [], []
+                st.error(f"❌ Couldn't read the roster: {e}")
+            if skipped:
+                st.warning(f"⚠️ Skipped {len(skipped)} row(s):\n\n" + "\n".join(f"- {p}" for p in skipped[:20]))
+            if roster:
+                with st.spinner("Rendering certificates..."):
+                    zip_buffer = BytesIO()
+                    count = render_batch(roster, zip_buffer, cert_format)
+                st.success(f"✅ {count} certificates ready")
+                st.download_button("⬇️ Download ZIP", zip_buffer.getvalue(),
+                                   file_name="certificates.zip", mime="application/zip")
+
 elif page == "AI":
     st.markdown('<div class="mega-header">🤖 Green Energy AI Assistant</div>', unsafe_allow_html=True)
 
@@ -777,36 +1075,100 @@ elif page == "AI":
             </div>
         """, unsafe_allow_html=True)
 
-        user_input = st.text_area("Ask a Green Energy Question", height=160,
+        collect_ai_jobs()
+        conversation = get_conversation()
+        for question, answer in conversation.turns[-6:]:
+            with st.chat_message("user"):
+                st.write(question)
+            with st.chat_message("assistant"):
+                st.write(answer)
+
+        audio_widget = getattr(st, "audio_input", None) or getattr(st, "experimental_audio_input", None)
+        if audio_widget is not None:
+            recording = audio_widget("🎤 Or ask by voice", key="voice_question")
+        else:
+            recording = st.file_uploader("🎤 Or ask by voice (upload a recording)",
+                                         type=["wav", "mp3", "m4a", "ogg", "webm"], key="voice_question")
+        if recording is not None:
+            audio_bytes = recording.getvalue()
+            audio_id = hashlib.sha1(audio_bytes).hexdigest()
+            if st.session_state.get("voice_processed") != audio_id:
+                st.session_state["voice_processed"] = audio_id
+                with st.spinner("Listening..."):
+                    try:
+                        voice = transcribe_audio(audio_bytes, get_speech_recognizer())
+                    except Exception as e:
+                        voice = None
+                        st.error(f"Voice recognition failed: {str(e)}")
+                if voice and voice["text"]:
+                    st.session_state["ai_question"] = voice["text"]
+                    st.caption(f"🎤 {voice['speech_s']:.1f}s of speech in {voice['chunks']} chunks, "
+                               f"recognised in {voice['elapsed_s']:.1f}s")
+                elif voice:
+                    st.warning("Couldn't hear a question. Please try again closer to the microphone.")
+
+        user_input = st.text_area("Ask a Green Energy Question", height=160, key="ai_question",
                                  placeholder="E.g., How can I reduce my electricity bill? Best solar setups in India?")
         if st.button("Ask AI"):
             if user_input.strip() == "":
                 st.warning("Please enter a question.")
             else:
-                with st.spinner("Generating AI response..."):
-                    use_offline = st.session_state.get("force_offline_ai", False)
-                    response_text, used_offline = generate_ai_response(user_input, use_offline=use_offline)
-
-                    st.markdown("### AI's Response:")
-                    st.write(response_text)
-
-                    if st.button("🔊 Hear this as Audio"):
-                        try:
-                            tts = gTTS(response_text[:500])
-                            buffer = BytesIO()
-                            tts.write_to_fp(buffer)
-                            buffer.seek(0)
-                            st.audio(buffer, format="audio/mp3")
-                        except Exception as e:
-                            st.error(f"Audio playback error: {str(e)}")
+                use_offline = st.session_state.get("force_offline_ai", False)
+                if SESSION_ID is None:  # no session context: answer inline
+                    prompt, answered = None, generate_ai_response(user_input, use_offline=use_offline)
+                else:
+                    prompt, answered = prepare_ai_request(user_input, use_offline=use_offline)
+                if answered is not None:
+                    record_ai_turn(user_input, answered[0])
+                    st.rerun()
+                else:
+                    AI_JOBS.submit(SESSION_ID, "ai", run_ai_request, user_input, prompt,
+                                   deadline_s=AI_JOB_DEADLINE, meta={"question": user_input}, pass_job=True)
+
+        pending_ai = AI_JOBS.pending(SESSION_ID, "ai") if SESSION_ID is not None else []
+        for job in pending_ai:
+            wait_col, cancel_col = st.columns([4, 1])
+            wait_col.info(f"⏳ Thinking about \"{job.meta['question'][:80]}\" ({job.seconds_waiting():.0f}s). "
+                          "Feel free to explore other pages - the answer will be here when you're back.")
+            if cancel_col.button("Cancel", key=f"cancel_{job.id}"):
+                AI_JOBS.cancel(SESSION_ID, job.id)
+                st.rerun()
+
+        if conversation.turns and SESSION_ID is not None:
+            if AI_JOBS.pending(SESSION_ID, "tts"):
+                st.caption("🔊 Preparing audio...")
+            elif st.button("🔊 Hear latest answer"):
+                st.session_state.pop("tts_audio", None)
+                AI_JOBS.submit(SESSION_ID, "tts", text_to_mp3, conversation.turns[-1][1],
+                               deadline_s=AI_JOB_DEADLINE)
+                st.rerun()
+            if "tts_error" in st.session_state:
+                st.error(f"Audio playback error: {st.session_state.pop('tts_error')}")
+            if st.session_state.get("tts_audio") is not None:
+                st.audio(resolve(st.session_state["tts_audio"]), format="audio/mp3")
+
+        if SESSION_ID is not None and AI_JOBS.pending(SESSION_ID):
+            @st.fragment(run_every=1.0)
+            def _poll_ai_jobs():
+                """Rerun the page once a background answer or audio clip is ready"""
+                if not AI_JOBS.pending(SESSION_ID):
+                    st.rerun()
+
+            _poll_ai_jobs()
 
     with col2:
         st.markdown("### AI Controls")
         st.checkbox("✨ Use offline AI (force)", key="force_offline_ai", help="Instant responses, no rate limits")
+        if st.button("🧹 New conversation", use_container_width=True):
+            get_conversation().clear()
+            st.session_state.pop("tts_audio", None)
+            st.rerun()
         st.markdown("**API Status:**")
         st.code(API_STATUS)
         if API_ERROR:
             st.caption(f"ℹ️ {API_ERROR[:100]}")
+        if st.session_state.get("last_ai_provider"):
+            st.caption(f"🤖 Last AI answer from: {st.session_state['last_ai_provider']}")
         st.markdown("---")
         st.markdown("**For Better Experience:**")
         st.info("✨ **Use Offline Mode** for live demo (instant + no quotas)", icon="⚡")
@@ -847,6 +1209,14 @@ elif page == "Quiz":
     if st.button("🎯 Submit Quiz", use_container_width=True):
         percentage = (score / len(questions)) * 100
         st.session_state["quiz_score"] = score
+        # Radios keep their values, so re-submitting the same answers isn't a new attempt
+        answers_key = hashlib.sha1(repr(sorted(st.session_state["quiz_answers"].items())).encode()).hexdigest()
+        if answers_key != st.session_state.get("quiz_submitted"):
+            st.session_state["quiz_submitted"] = answers_key
+            record_event("quiz", {"score": score, "total": len(questions)})
+            quiz_achievements = unlock_achievements("quiz", score, len(questions))
+        else:
+            quiz_achievements = []
         st.markdown(f"""
             <div class="metric-display">
                 <div class="metric-value">{score}/{len(questions)}</div>
@@ -862,14 +1232,17 @@ elif page == "Quiz":
             st.info("✅ **Good Job!** Keep Learning!")
         else:
             st.warning("📚 **Try Again!** More study needed.")
+        for ach in quiz_achievements:
+            st.success(f"🔓 New: {ach}")
     st.markdown('</div>', unsafe_allow_html=True)
 
 elif page == "Analytics":
     st.markdown('<div class="mega-header">📈 Advanced Analytics</div>', unsafe_allow_html=True)
-    if not st.session_state["history"] or len(st.session_state["history"]) == 0:
+    history = full_history()
+    if not history:
         st.warning("Calculate footprints first to unlock analytics!")
     else:
-        df = pd.DataFrame(st.session_state["history"])
+        df = pd.DataFrame(history)
         df['week'] = df['time'].dt.isocalendar().week
         weekly_avg = df.groupby('week')['total'].mean().reset_index()
         col1, col2 = st.columns(2)
@@ -881,6 +1254,33 @@ elif page == "Analytics":
                 fig_category = px.bar(df.tail(10), y=['transport', 'electricity', 'food'], title="Recent Breakdown", barmode='group')
                 st.plotly_chart(fig_category, use_container_width=True)
 
+    st.subheader("🌐 All Kiosks")
+    if SYNC_SHARED_DIR:
+        if st.button("🔄 Sync with other kiosks"):
+            try:
+                result = SYNC_LOG.sync(SYNC_SHARED_DIR)
+                st.success(f"Exported {result['exported']} batches, imported {result['imported']} "
+                           f"({result['events']} events)")
+            except OSError as e:
+                st.error(f"Sync failed: {e}")
+    else:
+        st.caption(f"Kiosk {SYNC_LOG.node}. Sync via USB: python sync_log.py sync /media/usb")
+    all_carbon = SYNC_LOG.frame("carbon")
+    all_quiz = SYNC_LOG.frame("quiz")
+    all_ai = SYNC_LOG.events("ai")
+    kiosks = sorted(set(all_carbon["node"]) | set(all_quiz["node"]) | set(all_ai["node"]) | {SYNC_LOG.node})
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("🖥️ Kiosks", len(kiosks))
+    col2.metric("🌍 Calculations", len(all_carbon))
+    col3.metric("🧠 Avg Quiz", f"{all_quiz['score'].mean():.1f}/{all_quiz['total'].max():g}"
+                if len(all_quiz) else "-")
+    col4.metric("🤖 AI Questions", len(all_ai))
+    if len(all_carbon):
+        per_kiosk = all_carbon.groupby("node").agg(visitors=("session", "nunique"), avg_co2=("total", "mean")).reset_index()
+        fig_kiosk = px.bar(per_kiosk, x="node", y="avg_co2", hover_data=["visitors"],
+                           title="Average CO₂ per Kiosk", labels={"node": "Kiosk", "avg_co2": "kg CO₂/day"})
+        st.plotly_chart(fig_kiosk, use_container_width=True)
+
 elif page == "Timeline":
     st.markdown('<div class="mega-header">📅 Development Timeline</div>', unsafe_allow_html=True)
     st.markdown('<div class="timeline-master">', unsafe_allow_html=True)
@@ -0,0 +1,51 @@
+"""
+Emission factors and scoring helpers shared by the Streamlit app and offline
+tools (certificate rendering runs in worker processes that can't import app.py).
+"""
+GRID_FACTOR = 0.82  # kg CO2 per kWh, Indian grid average
+TRANSPORT_FACTORS = {"Petrol": 0.118, "Diesel": 0.134, "Electric": 0.02, "CNG": 0.08}
+FOOD_FACTORS = {"Vegetarian": 2.0, "Eggetarian": 3.0, "Chicken": 4.5, "Fish": 5.5, "Mixed Non-Veg": 6.5}
+LPG_KG_PER_CYLINDER = 42.5
+AC_KW = 1.5
+GEYSER_KW = 2.0
+WASTE_FACTOR = 0.09
+WATER_FACTOR = 0.0005
+
+
+def footprint_breakdown(km_daily, fuel_type, kwh_monthly, lpg_cylinders, diet_type,
+                        ac_hours, geyser_hours, waste_kg, water_usage):
+    """kg CO2 per day for each calculator category"""
+    return {
+        "transport": km_daily * TRANSPORT_FACTORS[fuel_type],
+        "electricity": (kwh_monthly * GRID_FACTOR) / 30,
+        "food": FOOD_FACTORS[diet_type],
+        "lpg": (lpg_cylinders * LPG_KG_PER_CYLINDER) / 365,
+        "ac": ac_hours * AC_KW * GRID_FACTOR,
+        "geyser": geyser_hours * GEYSER_KW * GRID_FACTOR,
+        "waste": waste_kg * WASTE_FACTOR,
+        "water": water_usage * WATER_FACTOR,
+    }
+
+
+def carbon_badge(score):
+    if score < 6:
+        return "🟢🌟 *Eco Champion* - World Class!"
+    elif score < 10:
+        return "🟢 *Eco Friendly* - Excellent!"
+    elif score < 15:
+        return "🟡 *Moderate* - Room to Improve"
+    else:
+        return "🔴⚠️ *High Impact* - Urgent Action Needed!"
+
+
+def achievements_system(score):
+    achievements = []
+    if score < 6:
+        achievements.extend(["🌟 Eco-Starter Elite", "🏆 Global Green Leader"])
+    elif score < 10:
+        achievements.extend(["💚 Green Lifestyle Pro", "⭐ Sustainable Star"])
+    elif score < 15:
+        achievements.extend(["🔥 Carbon Warrior", "📈 Improvement Needed"])
+    else:
+        achievements.extend(["⚠️ High Alert", "🎯 Target for Change"])
+    return achievements
@@ -0,0 +1,256 @@
+"""
+Green Commitment certificates (PNG / PDF) rendered with Pillow.
+
+Single certificates are rendered in-process for the app's download button.
+Batch mode renders a whole class or school in a ProcessPoolExecutor: every
+worker loads the fonts and the background template once in its initializer,
+and finished certificates are streamed straight into a zip archive.
+
+Usage:
+    python certificates.py roster.csv -o certificates.zip --format pdf --workers 8
+
+Roster CSV columns: name, total_co2, quiz_score and optionally quiz_total,
+achievements (separated by ";") and date.
+"""
+import argparse
+import csv
+import multiprocessing
+import os
+import re
+import time
+import unicodedata
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from io import BytesIO
+
+from PIL import Image, ImageDraw, ImageFont
+
+from achievements import WARNING_TIERS
+from carbon_model import carbon_badge, achievements_system
+
+CERT_SIZE = (1600, 1130)
+FONT_CANDIDATES = {
+    "bold": ["DejaVuSans-Bold.ttf", "Arial Bold.ttf", "arialbd.ttf", "LiberationSans-Bold.ttf"],
+    "regular": ["DejaVuSans.ttf", "Arial.ttf", "arial.ttf", "LiberationSans-Regular.ttf"],
+}
+GREEN = (0, 255, 136)
+CYAN = (0, 212, 255)
+GOLD = (255, 215, 0)
+LIGHT = (232, 232, 232)
+
+# Loaded once per process by load_assets()
+_ASSETS = None
+
+
+# ================================
+# ASSETS
+# ================================
+def _load_font(kind, size, font_path=None):
+    for candidate in ([font_path] if font_path else []) + FONT_CANDIDATES[kind]:
+        try:
+            return ImageFont.truetype(candidate, size)
+        except OSError:
+            continue
+    return ImageFont.load_default(size=size)
+
+
+def _build_template(size):
+    """Dark gradient background with the app's green/cyan frame"""
+    width, height = size
+    top, bottom = (10, 10, 15), (22, 33, 62)
+    column = Image.new("RGB", (1, height))
+    for y in range(height):
+        t = y / (height - 1)
+        column.putpixel((0, y), tuple(int(a + (b - a) * t) for a, b in zip(top, bottom)))
+    img = column.resize(size)
+
+    draw = ImageDraw.Draw(img)
+    draw.rounded_rectangle([30, 30, width - 30, height - 30], radius=40, outline=GREEN, width=6)
+    draw.rounded_rectangle([52, 52, width - 52, height - 52], radius=30, outline=CYAN, width=2)
+    draw.line([(width // 2 - 160, 250), (width // 2 + 160, 250)], fill=GREEN, width=5)
+    return img
+
+
+def load_assets(font_path=None, bold_font_path=None, template_path=None):
+    """Fonts + template for this process (called once per worker)"""
+    global _ASSETS
+    if template_path:
+        template = Image.open(template_path).convert("RGB").resize(CERT_SIZE)
+    else:
+        template = _build_template(CERT_SIZE)
+    assets = {
+        "title": _load_font("bold", 60, bold_font_path),
+        "name": _load_font("bold", 96, bold_font_path),
+        "body": _load_font("regular", 40, font_path),
+        "small": _load_font("regular", 30, font_path),
+    }
+    # Text that is identical on every certificate is drawn once, into the template
+    draw = ImageDraw.Draw(template)
+    _centered(draw, 140, "CERTIFICATE OF GREEN COMMITMENT", assets["title"], GREEN)
+    _centered(draw, 290, "This certifies that", assets["body"], LIGHT)
+    _centered(draw, 880, "Rashtriya Bal Vigyanik Pradarshani 2025", assets["body"], LIGHT)
+    assets["template"] = template
+    _ASSETS = assets
+    return _ASSETS
+
+
+def _assets():
+    return _ASSETS if _ASSETS is not None else load_assets()
+
+
+# ================================
+# RENDERING
+# ================================
+def plain_text(text):
+    """Drop emoji/symbols and markdown that the certificate fonts can't draw"""
+    kept = "".join(ch for ch in str(text)
+                   if ch not in "*\ufe0e\ufe0f\u200d"
+                   and unicodedata.category(ch) not in ("So", "Sk", "Cs", "Co"))
+    return re.sub(r"\s+", " ", kept).strip(" -")
+
+
+def _centered(draw, y, text, font, fill):
+    width = draw.textlength(text, font=font)
+    draw.text(((CERT_SIZE[0] - width) / 2, y), text, font=font, fill=fill)
+
+
+def certificate_record(name, total_co2, quiz_score=0, quiz_total=4, achievements=None, issued=None):
+    """Normalised record used by both single and batch rendering"""
+    total_co2 = float(total_co2)
+    return {
+        "name": str(name).strip() or "Green Champion",
+        "total_co2": total_co2,
+        "badge": carbon_badge(total_co2),
+        "achievements": list(achievements) if achievements else
+                        [a for a in achievements_system(total_co2) if a not in WARNING_TIERS],
+        "quiz_score": int(quiz_score),
+        "quiz_total": int(quiz_total),
+        "date": issued or date.today().strftime("%d %B %Y"),
+    }
+
+
+def render_certificate(record, fmt="png") -> bytes:
+    """Render one certificate record to PNG or PDF bytes"""
+    assets = _assets()
+    img = assets["template"].copy()
+    draw = ImageDraw.Draw(img)
+
+    _centered(draw, 350, plain_text(record["name"]), assets["name"], GOLD)
+    _centered(draw, 490, f"measured a daily footprint of {record['total_co2']:.2f} kg CO2",
+              assets["body"], LIGHT)
+    _centered(draw, 550, plain_text(record["badge"]), assets["body"], GREEN)
+
+    achievements = [plain_text(a) for a in record["achievements"][:4]]
+    if achievements:
+        _centered(draw, 640, "Achievements: " + "  |  ".join(achievements), assets["small"], CYAN)
+    _centered(draw, 700, f"Eco Quiz score: {record['quiz_score']}/{record['quiz_total']}",
+              assets["small"], CYAN)
+
+    _centered(draw, 940, f"Green Energy AI  -  {record['date']}", assets["small"], LIGHT)
+
+    buffer = BytesIO()
+    if fmt == "pdf":
+        img.save(buffer, format="PDF", resolution=150)
+    else:
+        img.save(buffer, format="PNG", compress_level=1)
+    return buffer.getvalue()
+
+
+# ================================
+# BATCH MODE
+# ================================
+def _render_job(job):
+    index, record, fmt = job
+    return index, record["name"], render_certificate(record, fmt)
+
+
+def _archive_name(index, name, fmt):
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", plain_text(name)).strip("_") or "certificate"
+    return f"{index + 1:04d}_{slug}.{fmt}"
+
+
+def render_batch(records, out, fmt="png", workers=None, chunksize=8,
+                 font_path=None, bold_font_path=None, template_path=None):
+    """
+    Render many certificates in a process pool and stream them into a zip.
+    ``out`` is a path or a writable binary file object. Returns the count.
+    """
+    jobs = [(i, record, fmt) for i, record in enumerate(records)]
+    # spawn: safe to use from inside the multi-threaded Streamlit server
+    ctx = multiprocessing.get_context("spawn")
+    count = 0
+    with zipfile.ZipFile(out, "w", compression=zipfile.ZIP_STORED) as archive, \
+            ProcessPoolExecutor(max_workers=workers or os.cpu_count(), mp_context=ctx,
+                                initializer=load_assets,
+                                initargs=(font_path, bold_font_path, template_path)) as pool:
+        # PNG/PDF payloads are already compressed, so store them as-is
+        for index, name, data in pool.map(_render_job, jobs, chunksize=chunksize):
+            archive.writestr(_archive_name(index, name, fmt), data)
+            count += 1
+    return count
+
+
+class RosterError(ValueError):
+    """The roster as a whole can't be used (e.g. a required column is missing)"""
+
+
+def read_roster(source):
+    """
+    Roster CSV (path or text file object) -> (certificate records, skipped rows).
+    Rows with unusable values are skipped and described in the second list
+    instead of aborting the whole batch.
+    """
+    if not hasattr(source, "read"):
+        with open(source, newline="", encoding="utf-8-sig") as f:
+            return read_roster(f)
+    reader = csv.DictReader(source)
+    missing = [col for col in ("name", "total_co2") if col not in (reader.fieldnames or [])]
+    if missing:
+        raise RosterError(f"Roster is missing required column(s): {', '.join(missing)}")
+
+    records, skipped = [], []
+    for row in reader:
+        achievements = [a.strip() for a in (row.get("achievements") or "").split(";") if a.strip()]
+        try:
+            total_co2 = (row.get("total_co2") or "").strip()
+            if not total_co2:
+                raise ValueError("total_co2 is blank")
+            records.append(certificate_record(
+                row["name"] or "",
+                total_co2,
+                quiz_score=row.get("quiz_score") or 0,
+                quiz_total=row.get("quiz_total") or 4,
+                achievements=achievements or None,
+                issued=row.get("date") or None,
+            ))
+        except (TypeError, ValueError) as e:
+            skipped.append(f"line {reader.line_num} ({row.get('name') or 'no name'}): {e}")
+    return records, skipped
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render certificates for a class or school")
+    parser.add_argument("roster", help="CSV with name,total_co2,quiz_score[,quiz_total,achievements,date]")
+    parser.add_argument("-o", "--output", default="certificates.zip")
+    parser.add_argument("--format", choices=["png", "pdf"], default="png")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--font", default=None, help="Regular .ttf font")
+    parser.add_argument("--bold-font", default=None, help="Bold .ttf font")
+    parser.add_argument("--template", default=None, help="Background image")
+    args = parser.parse_args()
+
+    try:
+        records, skipped = read_roster(args.roster)
+    except RosterError as e:
+        parser.exit(1, f"❌ {e}\n")
+    for problem in skipped:
+        print(f"⚠️ skipped {problem}")
+    start = time.perf_counter()
+    count = render_batch(records, args.output, args.format, args.workers,
+                         font_path=args.font, bold_font_path=args.bold_font, template_path=args.template)
+    print(f"🎓 {count} certificates -> {args.output} in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
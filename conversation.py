@@ -0,0 +1,116 @@
+"""
+Per-session conversation memory for the AI assistant.
+
+Prompts carry a rolling summary of older turns plus the last few turns
+verbatim and the visitor's per-category footprint, all inside a fixed token
+budget - so follow-up questions keep their context while prompt size stays
+bounded no matter how long the chat runs.
+
+Older turns are folded into the summary exactly once, when they leave the
+verbatim window; the summary is cached on the memory object and never
+recomputed for later calls.
+"""
+import re
+
+SYSTEM_PROMPT = ("You are a concise, practical assistant helping students reduce their carbon "
+                 "footprint in India. Reply in simple, actionable steps.")
+CATEGORIES = ("transport", "electricity", "food")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token for English)"""
+    return len(text) // 4 + 1
+
+
+def _clip(text: str, max_chars: int) -> str:
+    text = re.sub(r"\s+", " ", text).strip()
+    return text if len(text) <= max_chars else text[:max_chars - 1].rstrip() + "…"
+
+
+def extractive_summary(question: str, answer: str) -> str:
+    """One short line per turn: the question and the answer's first sentence"""
+    first_sentence = re.split(r"(?<=[.!?])\s", answer.strip(), maxsplit=1)[0]
+    return f"asked '{_clip(question, 80)}' -> {_clip(first_sentence, 120)}"
+
+
+def history_breakdown(history) -> str:
+    """Latest per-category footprint plus the running average, for the prompt"""
+    if not history:
+        return ""
+    latest = history[-1]
+    parts = [f"{cat} {latest[cat]:.1f}" for cat in CATEGORIES if cat in latest]
+    text = f"Latest recorded CO2: {latest.get('total', 0):.1f} kg/day"
+    if parts:
+        text += f" ({', '.join(parts)} kg/day)"
+    if len(history) > 1:
+        avg = sum(h.get("total", 0) for h in history) / len(history)
+        text += f"; average over {len(history)} calculations: {avg:.1f} kg/day"
+    return text + "."
+
+
+class ConversationMemory:
+    """Stored in st.session_state["ai_chat"]; plain attributes so it pickles for disk spill"""
+
+    def __init__(self, keep_verbatim=3, token_budget=900, summary_budget=250,
+                 answer_chars=600, max_transcript=50, summarizer=extractive_summary):
+        self.keep_verbatim = keep_verbatim
+        self.max_transcript = max_transcript
+        self.token_budget = token_budget
+        self.summary_budget = summary_budget
+        self.answer_chars = answer_chars
+        self.summarizer = summarizer
+        self.turns = []          # (question, answer) - full transcript for display
+        self.summary_lines = []  # one cached line per folded turn
+        self.summarized = 0      # turns[:summarized] are folded into summary_lines
+
+    def add_turn(self, question: str, answer: str):
+        self.turns.append((question, answer))
+        while len(self.turns) - self.summarized > self.keep_verbatim:
+            q, a = self.turns[self.summarized]
+            self.summary_lines.append(self.summarizer(q, a))
+            self.summarized += 1
+        # Only the tail of the transcript is ever displayed; older turns live on in the summary
+        if len(self.turns) > self.max_transcript:
+            drop = len(self.turns) - self.max_transcript
+            del self.turns[:drop]
+            self.summarized -= drop
+        # Oldest summary lines go first once the summary outgrows its budget
+        while len(self.summary_lines) > 1 and estimate_tokens("; ".join(self.summary_lines)) > self.summary_budget:
+            self.summary_lines.pop(0)
+
+    def clear(self):
+        self.turns = []
+        self.summary_lines = []
+        self.summarized = 0
+
+    def build_prompt(self, question: str, history=None, system: str = SYSTEM_PROMPT) -> str:
+        """System line + breakdown + summary + recent turns + question, within token_budget"""
+        head = system
+        breakdown = history_breakdown(history)
+        if breakdown:
+            head += " " + breakdown
+        tail = f"Question: {_clip(question, 2000)}"
+
+        summary = "; ".join(self.summary_lines)
+        recent = [f"Student: {_clip(q, 300)}\nAssistant: {_clip(a, self.answer_chars)}"
+                  for q, a in self.turns[self.summarized:]]
+
+        def assemble():
+            sections = [head]
+            if summary:
+                sections.append(f"Earlier in this conversation the student {summary}")
+            if recent:
+                sections.append("Recent conversation:\n" + "\n".join(recent))
+            sections.append(tail)
+            return "\n\n".join(sections)
+
+        prompt = assemble()
+        # Over budget: drop the oldest verbatim turns, then shorten the summary
+        while estimate_tokens(prompt) > self.token_budget and recent:
+            recent.pop(0)
+            prompt = assemble()
+        if estimate_tokens(prompt) > self.token_budget and summary:
+            spare_chars = max((self.token_budget - estimate_tokens(prompt) + estimate_tokens(summary)) * 4, 0)
+            summary = _clip(summary[-spare_chars:], spare_chars) if spare_chars > 40 else ""
+            prompt = assemble()
+        return prompt
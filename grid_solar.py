@@ -0,0 +1,249 @@
+"""
+Hourly grid-intensity and rooftop-solar simulation.
+
+The calculator's flat 0.82 kg/kWh ignores *when* electricity is used: evening
+AC runs on a coal-heavy grid, while midday load partly meets solar. This
+module works on 8760-hour yearly profiles stored as float32 ``.npy`` files:
+
+    data/profiles/grid_<region>.npy     kg CO2 per kWh, hour by hour
+    data/profiles/solar_<location>.npy  kWh per installed kWp, hour by hour
+
+Profiles are opened with ``np.load(mmap_mode="r")`` on first use of that
+region or location (nothing is read at import), so only the pages actually
+touched by the simulation cost any I/O. Missing profiles are synthesised
+deterministically from latitude, sun position, monsoon cloudiness and
+regional generation mix; drop real data (CEA grid factors, NSRDB/PVGIS
+irradiance) into the same file names to replace them. The directory can be
+moved with GRID_PROFILE_DIR (or ``configure()``); if it isn't writable, the
+synthetic profiles go to a temp directory instead.
+
+Appliance emissions and PV offsets are then plain yearly dot products:
+
+    python grid_solar.py simulate Delhi 3 --ac 4 --geyser 1
+    python grid_solar.py generate            # write every profile up front
+"""
+import argparse
+import os
+import tempfile
+import time
+import uuid
+import zlib
+from functools import lru_cache
+
+import numpy as np
+
+from carbon_model import AC_KW, GEYSER_KW, GRID_FACTOR
+
+HOURS = 8760
+PROFILE_DIR = os.environ.get("GRID_PROFILE_DIR") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "data", "profiles")
+FALLBACK_DIR = os.path.join(tempfile.gettempdir(), "greenenergy-profiles")
+_MONTH_DAYS = [31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
+_MONTH_START_HOURS = np.cumsum([0] + _MONTH_DAYS[:-1]) * 24
+
+# region: (average kg CO2/kWh, share of midday demand met by solar, monsoon hydro dip)
+REGIONS = {
+    "Northern": (0.78, 0.18, 0.08),
+    "Western": (0.86, 0.16, 0.03),
+    "Southern": (0.72, 0.22, 0.06),
+    "Eastern": (0.95, 0.06, 0.02),
+    "North-Eastern": (0.48, 0.05, 0.20),
+}
+# location: (latitude, region, kWh/kWp/year, monsoon months (1-12), monsoon sunshine factor)
+LOCATIONS = {
+    "Delhi": (28.6, "Northern", 1500, (7, 8), 0.70),
+    "Jaipur": (26.9, "Northern", 1650, (7, 8), 0.80),
+    "Mumbai": (19.1, "Western", 1400, (6, 7, 8, 9), 0.45),
+    "Ahmedabad": (23.0, "Western", 1600, (7, 8), 0.60),
+    "Bengaluru": (13.0, "Southern", 1500, (6, 7, 8, 9, 10), 0.70),
+    "Chennai": (13.1, "Southern", 1500, (10, 11, 12), 0.70),
+    "Kolkata": (22.6, "Eastern", 1300, (6, 7, 8, 9), 0.60),
+    "Guwahati": (26.1, "North-Eastern", 1200, (5, 6, 7, 8, 9), 0.60),
+}
+
+
+# ================================
+# SYNTHETIC PROFILES
+# ================================
+@lru_cache(maxsize=1)
+def _calendar():
+    """(day of year, hour of day, month 1-12) for every hour of a non-leap year"""
+    hours = np.arange(HOURS)
+    day = hours // 24
+    month = np.searchsorted(np.cumsum(_MONTH_DAYS), day, side="right") + 1
+    return day, hours % 24, month
+
+
+def _rng(name):
+    return np.random.default_rng(zlib.crc32(name.encode()))
+
+
+def _sun(latitude):
+    """Clear-sky shape: positive sine of the solar elevation for each hour"""
+    day, hod, _ = _calendar()
+    decl = np.radians(23.45) * np.sin(2 * np.pi * (284 + day + 1) / 365)
+    hour_angle = np.radians(15 * (hod + 0.5 - 12))
+    lat = np.radians(latitude)
+    sin_alt = np.sin(lat) * np.sin(decl) + np.cos(lat) * np.cos(decl) * np.cos(hour_angle)
+    return np.clip(sin_alt, 0, None)
+
+
+def _make_solar(location):
+    latitude, _, annual_yield, wet_months, wet_factor = LOCATIONS[location]
+    day, _, month = _calendar()
+    rng = _rng(location)
+    cloud = np.where(np.isin(month, wet_months), wet_factor, 1.0)
+    cloud = cloud * (1 - 0.3 * rng.random(365) ** 2)[day]  # day-to-day weather
+    output = _sun(latitude) ** 1.2 * cloud
+    return output * (annual_yield / output.sum())
+
+
+def _make_grid(region):
+    average, solar_share, hydro_dip = REGIONS[region]
+    _, hod, month = _calendar()
+    rng = _rng(region)
+    evening_peak = 0.08 * np.exp(-((hod - 20) / 2.5) ** 2)
+    midday_dip = solar_share * _sun(23.0) / _sun(23.0).max()
+    monsoon = np.where(np.isin(month, (7, 8, 9)), hydro_dip, 0.0)
+    noise = np.convolve(rng.standard_normal(HOURS + 5), np.ones(6) / 6, mode="valid")
+    intensity = (1 + evening_peak - midday_dip - monsoon) * (1 + 0.03 * noise)
+    return intensity * (average / intensity.mean())
+
+
+# ================================
+# PROFILE STORAGE
+# ================================
+def configure(profile_dir):
+    """Point at another profile directory (call before the first simulation)"""
+    global PROFILE_DIR
+    PROFILE_DIR = profile_dir
+
+
+def _write_profile(directory, name, make):
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{name}.npy")
+    tmp = f"{path}.{uuid.uuid4().hex}.tmp"  # concurrent sessions may generate at once
+    with open(tmp, "wb") as f:
+        np.save(f, make().astype(np.float32))
+    os.replace(tmp, path)
+    return path
+
+
+def _profile(name, make):
+    """Load from PROFILE_DIR, then the temp fallback; synthesise into whichever is writable"""
+    path = next((p for p in (os.path.join(d, f"{name}.npy") for d in (PROFILE_DIR, FALLBACK_DIR))
+                 if os.path.exists(p)), None)
+    if path is None:
+        try:
+            path = _write_profile(PROFILE_DIR, name, make)
+        except OSError:  # read-only deploy
+            path = _write_profile(FALLBACK_DIR, name, make)
+    profile = np.load(path, mmap_mode="r")
+    if profile.shape != (HOURS,):
+        raise ValueError(f"{path}: expected {HOURS} hourly values, got {profile.shape}")
+    return profile
+
+
+def _slug(name):
+    return name.lower().replace(" ", "_")
+
+
+@lru_cache(maxsize=None)
+def grid_intensity(region):
+    """Memory-mapped hourly kg CO2/kWh for a grid region"""
+    return _profile(f"grid_{_slug(region)}", lambda: _make_grid(region))
+
+
+@lru_cache(maxsize=None)
+def solar_yield(location):
+    """Memory-mapped hourly kWh per kWp for a location"""
+    return _profile(f"solar_{_slug(location)}", lambda: _make_solar(location))
+
+
+@lru_cache(maxsize=1)
+def _usage_shapes():
+    """
+    When AC and geyser hours fall across the year: rows scaled so each sums
+    to 365, i.e. 'one hour a day' spread over hours/seasons of real use.
+    """
+    _, hod, month = _calendar()
+    ac_hour = np.where((hod >= 13) & (hod < 17), 1.0, np.where((hod >= 21) | (hod < 5), 1.2, 0.2))
+    ac_season = np.select([np.isin(month, (4, 5, 6)), np.isin(month, (3, 7, 8, 9, 10))], [1.6, 1.0], 0.15)
+    geyser_hour = np.where((hod >= 6) & (hod < 9), 1.0, np.where((hod >= 18) & (hod < 21), 0.4, 0.0))
+    geyser_season = np.select([np.isin(month, (11, 12, 1, 2)), np.isin(month, (3, 10))], [1.8, 1.0], 0.4)
+    shapes = np.stack([ac_hour * ac_season, geyser_hour * geyser_season])
+    return shapes * (365 / shapes.sum(axis=1, keepdims=True))
+
+
+# ================================
+# SIMULATION
+# ================================
+@lru_cache(maxsize=64)
+def appliance_factors(region):
+    """Time-of-use kg CO2/kWh for AC and geyser use in ``region`` (vs the flat factor)"""
+    ac, geyser = _usage_shapes() @ grid_intensity(region) / 365
+    return {"ac": float(ac), "geyser": float(geyser), "average": float(grid_intensity(region).mean())}
+
+
+def appliance_emissions(region, ac_hours, geyser_hours):
+    """kg CO2/day for the calculator's AC and geyser hours, flat vs time-of-use"""
+    factors = appliance_factors(region)
+    ac_kwh, geyser_kwh = ac_hours * AC_KW, geyser_hours * GEYSER_KW
+    return {
+        "ac_flat": ac_kwh * GRID_FACTOR, "ac_tou": ac_kwh * factors["ac"],
+        "geyser_flat": geyser_kwh * GRID_FACTOR, "geyser_tou": geyser_kwh * factors["geyser"],
+    }
+
+
+@lru_cache(maxsize=512)
+def solar_offset(location, kw):
+    """Yearly output and avoided grid emissions of a ``kw`` rooftop system at ``location``"""
+    region = LOCATIONS[location][1]
+    generation = solar_yield(location) * kw
+    annual_kwh = float(generation.sum())
+    avoided = float(generation @ grid_intensity(region))
+    return {
+        "location": location,
+        "region": region,
+        "kw": kw,
+        "annual_kwh": annual_kwh,
+        "monthly_kwh": np.add.reduceat(np.asarray(generation), _MONTH_START_HOURS).tolist(),
+        "kg_per_year": avoided,
+        "kg_per_day": avoided / 365,
+        "capacity_factor": annual_kwh / (kw * HOURS) if kw else 0.0,
+        "displaced_intensity": avoided / annual_kwh if annual_kwh else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hourly grid / rooftop solar simulation")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("generate", help="Write every synthetic profile that doesn't exist yet")
+    sim = sub.add_parser("simulate", help="Simulate one location")
+    sim.add_argument("location", choices=list(LOCATIONS))
+    sim.add_argument("kw", type=float, help="Rooftop system size in kWp")
+    sim.add_argument("--ac", type=float, default=2.0, help="AC hours per day")
+    sim.add_argument("--geyser", type=float, default=0.5, help="Geyser hours per day")
+    args = parser.parse_args()
+
+    if args.command == "generate":
+        for region in REGIONS:
+            grid_intensity(region)
+        for location in LOCATIONS:
+            solar_yield(location)
+        print(f"📁 {len(REGIONS)} grid and {len(LOCATIONS)} solar profiles in {PROFILE_DIR}")
+        return
+
+    start = time.perf_counter()
+    pv = solar_offset(args.location, args.kw)
+    use = appliance_emissions(pv["region"], args.ac, args.geyser)
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"☀️ {args.kw:g} kW in {args.location}: {pv['annual_kwh']:,.0f} kWh/yr "
+          f"(CF {pv['capacity_factor']:.1%}), avoids {pv['kg_per_year']:,.0f} kg CO2/yr")
+    print(f"❄️ AC {args.ac:g} h/day: {use['ac_tou']:.2f} kg/day (flat {use['ac_flat']:.2f})")
+    print(f"🚿 Geyser {args.geyser:g} h/day: {use['geyser_tou']:.2f} kg/day (flat {use['geyser_flat']:.2f})")
+    print(f"   in {elapsed:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,395 @@
+"""
+Concurrent-visitor load test for the Streamlit app.
+
+Starts the local mock LLM and a real ``streamlit run app.py`` server, then
+drives it with N concurrent websocket clients that speak the same protobuf
+protocol as the browser. Each simulated visitor follows an exhibition-style
+script (navigate, submit the carbon form, ask the AI, take the quiz) with
+human think-time between clicks, while concurrency is ramped level by level.
+
+Usage:
+    python loadtest.py --levels 1,10,25,50,100 --duration 30
+    python loadtest.py --url http://kiosk-server:8501 --server-pid 4242
+
+Reports throughput (reruns/s), p50/p99 rerun latency, p50/p99 time until an
+AI answer shows up in the chat (answers are produced by background jobs, so
+the visitor keeps polling like the browser's fragment timer) and server RSS
+per level, and the first level where latency degrades.
+
+(In-process ``AppTest`` sessions can't be used here: each run swaps a global
+Runtime singleton, so concurrent AppTests in one process break each other.)
+"""
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import requests
+from tornado.websocket import websocket_connect
+
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+from mock_llm_server import start_mock_server
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+
+QUESTIONS = [
+    "How can I reduce my electricity bill?",
+    "Is a 3kW rooftop solar system enough for my home?",
+    "What is the best way to cut transport emissions to school?",
+    "Does eating less meat really help?",
+    "How much water does a shower waste?",
+]
+
+
+# ================================
+# SERVER PROCESS
+# ================================
+def process_rss_mb(pid):
+    """Resident set size of a process in MB (None if unavailable)"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def start_streamlit(port, llm_url, timeout=60):
+    """Launch ``streamlit run app.py`` with secrets pointing at the mock LLM"""
+    workdir = tempfile.mkdtemp(prefix="loadtest-")
+    os.makedirs(os.path.join(workdir, ".streamlit"))
+    with open(os.path.join(workdir, ".streamlit", "secrets.toml"), "w") as f:
+        f.write(f'LOCAL_LLM_URL = "{llm_url}"\nLLM_PROVIDERS = "local"\n')
+
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", APP_PATH,
+         "--server.headless", "true",
+         "--server.port", str(port),
+         "--server.enableXsrfProtection", "false",
+         "--server.fileWatcherType", "none",
+         "--browser.gatherUsageStats", "false"],
+        cwd=workdir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(f"{url}/_stcore/health", timeout=1).ok:
+                return proc, url
+        except requests.RequestException:
+            pass
+        time.sleep(0.3)
+    proc.kill()
+    raise RuntimeError("Streamlit server did not become healthy")
+
+
+# ================================
+# WEBSOCKET VISITOR
+# ================================
+class Visitor:
+    """One browser tab talking to the server over /_stcore/stream"""
+
+    def __init__(self, url, rng, think_time=1.5, timeout=60.0):
+        self.ws_url = url.replace("http", "ws", 1).rstrip("/") + "/_stcore/stream"
+        self.rng = rng
+        self.think_time = think_time
+        self.timeout = timeout
+        self.conn = None
+        self.elements = []
+        self.latencies = []
+        self.ai_latencies = []   # question submitted -> answer visible in the chat
+        self.errors = 0
+        self.error_samples = []
+
+    async def connect(self):
+        self.conn = await websocket_connect(self.ws_url, subprotocols=["streamlit"])
+        await self.rerun()
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+
+    def _error(self, message):
+        self.errors += 1
+        if len(self.error_samples) < 5:
+            self.error_samples.append(message[:200])
+
+    async def rerun(self, *widget_states):
+        """Send one rerun request and wait until the script run settles"""
+        msg = BackMsg()
+        msg.rerun_script.query_string = ""
+        msg.rerun_script.widget_states.widgets.extend(widget_states)
+
+        start = time.perf_counter()
+        await self.conn.write_message(msg.SerializeToString(), binary=True)
+        self.elements = []
+        try:
+            await asyncio.wait_for(self._read_until_finished(), self.timeout)
+        except asyncio.TimeoutError:
+            self._error(f"rerun timed out after {self.timeout:.0f}s")
+        self.latencies.append(time.perf_counter() - start)
+
+    async def _read_until_finished(self):
+        while True:
+            raw = await self.conn.read_message()
+            if raw is None:
+                raise ConnectionError("server closed the websocket")
+            fwd = ForwardMsg()
+            fwd.ParseFromString(raw)
+            kind = fwd.WhichOneof("type")
+            if kind == "new_session":
+                self.elements = []
+            elif kind == "delta" and fwd.delta.WhichOneof("type") == "new_element":
+                element = fwd.delta.new_element
+                el_type = element.WhichOneof("type")
+                if el_type == "exception":
+                    self._error(element.exception.message)
+                self.elements.append((el_type, getattr(element, el_type)))
+            elif kind == "script_finished":
+                if fwd.script_finished == ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                    self.elements = []
+                    continue
+                if fwd.script_finished == ForwardMsg.FINISHED_WITH_COMPILE_ERROR:
+                    self._error("script compile error")
+                return
+
+    def _find(self, el_type, label=None):
+        matches = [el for t, el in self.elements if t == el_type and (label is None or el.label == label)]
+        if not matches:
+            raise LookupError(f"{el_type} {label!r}")
+        return matches
+
+    def _ai_answered(self, question):
+        """Question is in the chat transcript and no job for it is still pending"""
+        texts = [(t, getattr(el, "body", "")) for t, el in self.elements]
+        return (("markdown", question) in texts
+                and not any(t == "alert" and body.startswith("⏳ Thinking about") for t, body in texts))
+
+    async def think(self):
+        await asyncio.sleep(self.think_time * self.rng.uniform(0.5, 1.5))
+
+    # ---- widget state helpers ----
+    @staticmethod
+    def trigger(widget):
+        return WidgetState(id=widget.id, trigger_value=True)
+
+    @staticmethod
+    def slider(widget, value):
+        state = WidgetState(id=widget.id)
+        state.double_array_value.data.append(value)
+        return state
+
+    @staticmethod
+    def index(widget, option):
+        return WidgetState(id=widget.id, int_value=list(widget.options).index(option))
+
+    @staticmethod
+    def text(widget, value):
+        return WidgetState(id=widget.id, string_value=value)
+
+    # ---- visitor actions ----
+    async def navigate(self, page):
+        buttons = [b for t, b in self.elements if t == "button" and f"nav_{page}" in b.id]
+        if not buttons:
+            raise LookupError(f"nav button {page}")
+        await self.rerun(self.trigger(buttons[0]))
+
+    async def carbon_form(self):
+        await self.navigate("Carbon")
+        await self.think()
+        submit = self._find("button", "🚀 Calculate Full Footprint")[0]
+        await self.rerun(
+            self.slider(self._find("slider", "Daily Travel (km)")[0], self.rng.randint(0, 60)),
+            self.index(self._find("selectbox", "Fuel Type")[0],
+                       self.rng.choice(["Petrol", "Diesel", "Electric", "CNG"])),
+            WidgetState(id=self._find("number_input", "Monthly Units")[0].id,
+                        int_value=self.rng.randint(50, 400)),
+            self.slider(self._find("slider", "AC Hours/Day")[0], self.rng.randint(0, 8)),
+            self.trigger(submit),
+        )
+
+    async def ask_ai(self, poll_interval=1.0):
+        if not any(t == "text_area" for t, _ in self.elements):
+            await self.navigate("AI")
+            await self.think()
+        question = self.rng.choice(QUESTIONS)
+        start = time.perf_counter()
+        await self.rerun(
+            self.text(self._find("text_area", "Ask a Green Energy Question")[0], question),
+            self.trigger(self._find("button", "Ask AI")[0]),
+        )
+        while not self._ai_answered(question):
+            if time.perf_counter() - start > self.timeout:
+                self._error(f"AI answer not shown after {self.timeout:.0f}s")
+                return
+            await asyncio.sleep(poll_interval)
+            await self.rerun()
+        self.ai_latencies.append(time.perf_counter() - start)
+
+    async def quiz(self):
+        await self.navigate("Quiz")
+        await self.think()
+        answers = [self.index(radio, self.rng.choice(list(radio.options))) for radio in self._find("radio")]
+        await self.rerun(*answers, self.trigger(self._find("button", "🎯 Submit Quiz")[0]))
+
+    async def exhibition_visit(self):
+        """Typical kiosk visit: calculator, history, a question or two, quiz"""
+        steps = [self.carbon_form, lambda: self.navigate("History"), self.ask_ai]
+        if self.rng.random() < 0.5:
+            steps.append(self.ask_ai)
+        if self.rng.random() < 0.5:
+            steps.append(self.quiz)
+        steps += [lambda: self.navigate("Analytics"), lambda: self.navigate("Home")]
+        for step in steps:
+            try:
+                await step()
+            except LookupError as e:
+                # Page didn't render the expected widget (usually a failed rerun)
+                self._error(f"missing widget {e}")
+            await self.think()
+
+
+async def run_visitor(url, seed, stop_at, think_time):
+    visitor = Visitor(url, random.Random(seed), think_time)
+    try:
+        # Stagger arrivals so a level doesn't start with a thundering herd
+        await asyncio.sleep(visitor.rng.uniform(0, think_time))
+        await visitor.connect()
+        while time.monotonic() < stop_at:
+            await visitor.exhibition_visit()
+    except (ConnectionError, OSError) as e:
+        visitor._error(repr(e))
+    finally:
+        visitor.close()
+    return visitor
+
+
+# ================================
+# LOAD LEVELS
+# ================================
+async def _sample_rss(pid, peak, stop):
+    while not stop.is_set():
+        rss = process_rss_mb(pid)
+        if rss is not None:
+            peak[0] = max(peak[0], rss)
+        try:
+            await asyncio.wait_for(stop.wait(), 0.5)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def run_level(url, concurrency, duration, think_time, server_pid=None, seed=0):
+    peak = [0.0]
+    stop = asyncio.Event()
+    sampler = asyncio.ensure_future(_sample_rss(server_pid, peak, stop)) if server_pid else None
+
+    start = time.perf_counter()
+    stop_at = time.monotonic() + duration
+    visitors = await asyncio.gather(*[run_visitor(url, seed + i, stop_at, think_time)
+                                      for i in range(concurrency)])
+    elapsed = time.perf_counter() - start
+    stop.set()
+    if sampler:
+        await sampler
+
+    latencies = np.array([lat for v in visitors for lat in v.latencies] or [0.0])
+    ai_latencies = np.array([lat for v in visitors for lat in v.ai_latencies] or [0.0])
+    reruns = sum(len(v.latencies) for v in visitors)
+    samples = [s for v in visitors for s in v.error_samples]
+    return {
+        "concurrency": concurrency,
+        "reruns": reruns,
+        "errors": sum(v.errors for v in visitors),
+        "throughput": reruns / elapsed,
+        "p50_ms": float(np.percentile(latencies, 50) * 1000),
+        "p99_ms": float(np.percentile(latencies, 99) * 1000),
+        "answers": sum(len(v.ai_latencies) for v in visitors),
+        "ai_p50_ms": float(np.percentile(ai_latencies, 50) * 1000),
+        "ai_p99_ms": float(np.percentile(ai_latencies, 99) * 1000),
+        "rss_mb": peak[0] if server_pid else None,
+        "error_samples": samples[:3],
+    }
+
+
+def find_degradation(results, factor=2.0, p99_limit_ms=None):
+    """First level whose p99 exceeds ``factor`` x the baseline p99 (or an absolute limit)"""
+    if not results:
+        return None
+    baseline = results[0]["p99_ms"]
+    for row in results[1:]:
+        if row["p99_ms"] > baseline * factor or (p99_limit_ms and row["p99_ms"] > p99_limit_ms):
+            return row["concurrency"]
+    return None
+
+
+def print_report(results, degraded_at):
+    print()
+    print(f"{'visitors':>9} {'reruns':>8} {'errors':>7} {'reruns/s':>9} {'p50 ms':>9} {'p99 ms':>9} "
+          f"{'answers':>8} {'AI p50':>9} {'AI p99':>9} {'RSS MB':>9}")
+    for r in results:
+        rss = f"{r['rss_mb']:.0f}" if r["rss_mb"] is not None else "n/a"
+        print(f"{r['concurrency']:>9} {r['reruns']:>8} {r['errors']:>7} {r['throughput']:>9.1f} "
+              f"{r['p50_ms']:>9.0f} {r['p99_ms']:>9.0f} "
+              f"{r['answers']:>8} {r['ai_p50_ms']:>9.0f} {r['ai_p99_ms']:>9.0f} {rss:>9}")
+        for sample in r["error_samples"]:
+            print(f"{'':>9} ⚠️ {sample}")
+    print()
+    if degraded_at is None:
+        print("✅ No latency degradation detected at the tested levels")
+    else:
+        print(f"⚠️ Latency degrades at {degraded_at} concurrent visitors")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate concurrent exhibition visitors")
+    parser.add_argument("--levels", default="1,10,25,50", help="Comma-separated concurrency levels")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds per level")
+    parser.add_argument("--think-time", type=float, default=1.5, help="Mean seconds between clicks")
+    parser.add_argument("--url", default=None, help="Test an already running server instead of starting one")
+    parser.add_argument("--server-pid", type=int, default=None, help="PID of --url server for RSS sampling")
+    parser.add_argument("--port", type=int, default=8599)
+    parser.add_argument("--llm-latency-ms", type=float, default=800.0)
+    parser.add_argument("--llm-error-rate", type=float, default=0.02)
+    parser.add_argument("--degrade-factor", type=float, default=2.0,
+                        help="p99 growth over the first level that counts as degradation")
+    parser.add_argument("--p99-limit-ms", type=float, default=None, help="Absolute p99 limit")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    levels = [int(x) for x in args.levels.split(",") if x.strip()]
+    mock, llm_url = start_mock_server(latency_ms=args.llm_latency_ms,
+                                      error_rate=args.llm_error_rate, seed=args.seed)
+    proc = None
+    try:
+        if args.url:
+            url, server_pid = args.url, args.server_pid
+        else:
+            proc, url = start_streamlit(args.port, llm_url)
+            server_pid = proc.pid
+
+        results = []
+        for level in levels:
+            print(f"▶ {level} visitors for {args.duration:.0f}s ...", flush=True)
+            results.append(asyncio.run(run_level(url, level, args.duration, args.think_time,
+                                                 server_pid, args.seed)))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=10)
+        mock.shutdown()
+
+    print_report(results, find_degradation(results, args.degrade_factor, args.p99_limit_ms))
+
+
+if __name__ == "__main__":
+    main()
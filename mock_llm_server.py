@@ -0,0 +1,163 @@
+"""
+Local mock LLM server for offline development and load testing.
+
+Speaks both the plain stub protocol used by ``LocalHTTPProvider``
+(POST /generate) and the OpenAI chat-completions route
+(POST /v1/chat/completions), with configurable latency and error rates.
+
+Usage:
+    python mock_llm_server.py --port 8765 --latency-ms 800 --tail-ms 4000 \
+        --tail-rate 0.05 --error-rate 0.02 --rate-limit-rate 0.01
+
+Then set ``LOCAL_LLM_URL = "http://127.0.0.1:8765"`` in .streamlit/secrets.toml.
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class MockConfig:
+    def __init__(self, latency_ms=500.0, jitter_ms=100.0, tail_ms=3000.0, tail_rate=0.0,
+                 error_rate=0.0, rate_limit_rate=0.0, seed=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.tail_ms = tail_ms
+        self.tail_rate = tail_rate
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def sample(self):
+        """Returns (delay_seconds, status_code) for one request"""
+        with self.lock:
+            delay = self.latency_ms + self.rng.uniform(-self.jitter_ms, self.jitter_ms)
+            if self.rng.random() < self.tail_rate:
+                delay = self.tail_ms
+            roll = self.rng.random()
+        if roll < self.rate_limit_rate:
+            status = 429
+        elif roll < self.rate_limit_rate + self.error_rate:
+            status = 500
+        else:
+            status = 200
+        return max(delay, 0.0) / 1000.0, status
+
+
+def mock_answer(prompt: str) -> str:
+    """Deterministic, keyword-flavoured reply so responses look plausible"""
+    sections = re.split(r"^### Question \d+\s*$", prompt, flags=re.MULTILINE)
+    if len(sections) > 1:
+        # Micro-batched prompt: answer each question under its own heading
+        return "\n".join(f"### Answer {i}\n{mock_answer(section)}"
+                         for i, section in enumerate(sections[1:], start=1))
+
+    question = prompt.rsplit("Question:", 1)[-1].strip()
+    topic = "energy savings"
+    for word in ("solar", "electricity", "transport", "food", "water", "waste"):
+        if word in question.lower():
+            topic = word
+            break
+    return (f"[mock] Here are practical steps on {topic}: "
+            f"1) measure your current usage, 2) fix the biggest source first, "
+            f"3) track progress weekly. (You asked: {question[:80]})")
+
+
+def make_handler(config: MockConfig):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, fmt, *args):
+            pass
+
+        def _send(self, status, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._send(200, {"status": "ok"})
+            else:
+                self._send(404, {"error": "not found"})
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            try:
+                data = json.loads(self.rfile.read(length) or b"{}")
+            except json.JSONDecodeError:
+                self._send(400, {"error": "invalid JSON"})
+                return
+
+            if self.path == "/generate":
+                prompt = data.get("prompt", "")
+            elif self.path == "/v1/chat/completions":
+                messages = data.get("messages") or [{}]
+                prompt = messages[-1].get("content", "")
+            else:
+                self._send(404, {"error": "not found"})
+                return
+
+            delay, status = config.sample()
+            time.sleep(delay)
+            if status == 429:
+                self._send(429, {"error": "429 rate limit exceeded (mock)"})
+                return
+            if status != 200:
+                self._send(status, {"error": "internal error (mock)"})
+                return
+
+            text = mock_answer(prompt)
+            if self.path == "/generate":
+                self._send(200, {"text": text})
+            else:
+                self._send(200, {
+                    "id": "mock-completion",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": data.get("model", "mock"),
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": text}}],
+                })
+
+    return Handler
+
+
+def start_mock_server(port: int = 0, host: str = "127.0.0.1", **config_kwargs):
+    """Start the server in a daemon thread. Returns (server, base_url)."""
+    server = ThreadingHTTPServer((host, port), make_handler(MockConfig(**config_kwargs)))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock LLM server with configurable latency and errors")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=500.0, help="Median response latency")
+    parser.add_argument("--jitter-ms", type=float, default=100.0, help="Uniform +/- jitter around the median")
+    parser.add_argument("--tail-ms", type=float, default=3000.0, help="Latency of slow (tail) responses")
+    parser.add_argument("--tail-rate", type=float, default=0.0, help="Fraction of responses that are slow")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of HTTP 500 responses")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of HTTP 429 responses")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    config = MockConfig(args.latency_ms, args.jitter_ms, args.tail_ms, args.tail_rate,
+                        args.error_rate, args.rate_limit_rate, args.seed)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(config))
+    print(f"🤖 Mock LLM listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
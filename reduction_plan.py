@@ -0,0 +1,187 @@
+"""
+Personal carbon reduction plan.
+
+The calculator's footprint is linear in a small feature vector (km per fuel,
+monthly kWh, food, LPG, AC and geyser hours, waste, water), so every action
+in the catalogue is an affine map of that vector, clipped at zero:
+
+    x' = max(M_a @ x + c_a, 0)          saving_a = W @ (x - x')
+
+All actions are evaluated in one einsum over the stacked (A, d, d) matrices.
+A greedy solver then builds the plan under effort / cost budgets. It picks
+the best kg-per-effort action, applies it and re-evaluates the rest against
+the updated vector, so overlapping actions (EV + carpooling) aren't counted
+twice. Actions in the same group (CNG vs EV, 2 vs 3 kW solar) exclude each
+other. Ranking uses saving per effort point only, so cost is a constraint,
+not a weight. The greedy plan is then compared with the single best action
+that fits both budgets and the larger saving wins; this guards against one
+big action being crowded out, but it's a heuristic - with two budgets and
+interacting actions it carries no optimality bound.
+"""
+import numpy as np
+
+from carbon_model import (AC_KW, FOOD_FACTORS, GEYSER_KW, GRID_FACTOR, LPG_KG_PER_CYLINDER,
+                          TRANSPORT_FACTORS, WASTE_FACTOR, WATER_FACTOR)
+
+BUS_FACTOR = 0.03  # kg CO2 per passenger-km, city bus / metro
+FUELS = {"Petrol": "km_petrol", "Diesel": "km_diesel", "Electric": "km_electric", "CNG": "km_cng"}
+FEATURES = ["km_petrol", "km_diesel", "km_electric", "km_cng", "km_bus",
+            "kwh_monthly", "food", "lpg", "ac_hours", "geyser_hours", "waste_kg", "water"]
+WEIGHTS = np.array([
+    TRANSPORT_FACTORS["Petrol"], TRANSPORT_FACTORS["Diesel"], TRANSPORT_FACTORS["Electric"],
+    TRANSPORT_FACTORS["CNG"], BUS_FACTOR,
+    GRID_FACTOR / 30, 1.0, LPG_KG_PER_CYLINDER / 365, AC_KW * GRID_FACTOR, GEYSER_KW * GRID_FACTOR,
+    WASTE_FACTOR, WATER_FACTOR,
+])
+_IDX = {name: i for i, name in enumerate(FEATURES)}
+_CAR_KM = ["km_petrol", "km_diesel", "km_electric", "km_cng"]
+
+
+def _scale(features, factor):
+    return {f: {f: factor} for f in features}
+
+
+def _shift(feature, amount):
+    return {feature: {feature: 1.0, "": amount}}
+
+
+class Action:
+    """
+    ``rows`` overrides rows of the identity map: {feature: {source: coef, "": const}}.
+    An empty dict zeroes the feature.
+    """
+
+    def __init__(self, key, label, category, effort, cost, rows, group=None):
+        self.key = key
+        self.label = label
+        self.category = category
+        self.effort = effort
+        self.cost = cost  # rough upfront ₹
+        self.group = group
+        self.rows = rows
+
+    def matrix(self):
+        m, c = np.eye(len(FEATURES)), np.zeros(len(FEATURES))
+        for target, sources in self.rows.items():
+            i = _IDX[target]
+            m[i] = 0.0
+            for source, coef in sources.items():
+                if source == "":
+                    c[i] = coef
+                else:
+                    m[i, _IDX[source]] = coef
+        return m, c
+
+
+ACTIONS = [
+    Action("cng", "🚗 Switch the car to CNG", "transport", 3, 60_000, group="fuel",
+           rows={"km_petrol": {}, "km_diesel": {},
+                 "km_cng": {"km_petrol": 1.0, "km_diesel": 1.0, "km_cng": 1.0}}),
+    Action("ev", "⚡ Switch to an electric scooter / car", "transport", 5, 120_000, group="fuel",
+           rows={"km_petrol": {}, "km_diesel": {}, "km_cng": {},
+                 "km_electric": {f: 1.0 for f in _CAR_KM}}),
+    Action("carpool", "🚙 Carpool on school / work days", "transport", 2, 0, group="mode",
+           rows=_scale(_CAR_KM, 0.6)),
+    Action("bus", "🚌 Take the bus or metro for half your trips", "transport", 3, 0, group="mode",
+           rows={**_scale(_CAR_KM, 0.5), "km_bus": {"km_bus": 1.0, **{f: 0.5 for f in _CAR_KM}}}),
+    Action("cycle", "🚲 Walk or cycle the short trips", "transport", 2, 5_000,
+           rows=_scale(_CAR_KM, 0.85)),
+    Action("led", "💡 Swap every bulb for LEDs", "electricity", 1, 1_500,
+           rows=_shift("kwh_monthly", -15)),
+    Action("standby", "🔌 Switch off standby at the plug", "electricity", 1, 0,
+           rows=_scale(["kwh_monthly"], 0.95)),
+    Action("star", "⭐ Replace old fans / fridge with 5-star models", "electricity", 2, 15_000,
+           rows=_scale(["kwh_monthly"], 0.85)),
+    Action("solar2", "☀️ 2 kW rooftop solar (after subsidy)", "electricity", 4, 60_000, group="solar",
+           rows=_shift("kwh_monthly", -240)),
+    Action("solar3", "☀️ 3 kW rooftop solar (after subsidy)", "electricity", 4, 100_000, group="solar",
+           rows=_shift("kwh_monthly", -360)),
+    Action("ac_temp", "❄️ Set the AC to 26 °C", "ac", 1, 0,
+           rows=_scale(["ac_hours"], 0.8)),
+    Action("ac_cut", "🌀 Use the fan instead of AC for 2 hours a day", "ac", 2, 0,
+           rows=_shift("ac_hours", -2)),
+    Action("geyser_timer", "⏲️ Put the geyser on a timer", "geyser", 1, 1_000, group="geyser",
+           rows=_scale(["geyser_hours"], 0.5)),
+    Action("solar_water", "🌞 Install a solar water heater", "geyser", 3, 25_000, group="geyser",
+           rows={"geyser_hours": {}}),
+    Action("veg2", "🥗 Two vegetarian days a week", "food", 2, 0, group="diet",
+           rows={"food": {"food": 5 / 7, "": 2 / 7 * FOOD_FACTORS["Vegetarian"]}}),
+    Action("veg", "🌱 Go vegetarian", "food", 4, 0, group="diet",
+           rows={"food": {"": FOOD_FACTORS["Vegetarian"]}}),
+    Action("cooker", "🍲 Pressure-cook and keep lids on pots", "lpg", 1, 0,
+           rows=_scale(["lpg"], 0.8)),
+    Action("compost", "♻️ Segregate and compost wet waste", "waste", 2, 500,
+           rows=_scale(["waste_kg"], 0.5)),
+    Action("water", "💧 Fix leaks and take bucket baths", "water", 1, 200,
+           rows=_scale(["water"], 0.7)),
+]
+_M, _C = (np.stack(parts) for parts in zip(*(a.matrix() for a in ACTIONS)))
+_EFFORT = np.array([a.effort for a in ACTIONS])
+_COST = np.array([a.cost for a in ACTIONS], dtype=float)
+
+
+def feature_vector(km_daily, fuel_type, kwh_monthly, lpg_cylinders, diet_type,
+                   ac_hours, geyser_hours, waste_kg, water_usage):
+    """Calculator inputs (same arguments as footprint_breakdown) -> feature vector"""
+    x = np.zeros(len(FEATURES))
+    x[_IDX[FUELS[fuel_type]]] = km_daily
+    x[_IDX["kwh_monthly"]] = kwh_monthly
+    x[_IDX["food"]] = FOOD_FACTORS[diet_type]
+    x[_IDX["lpg"]] = lpg_cylinders
+    x[_IDX["ac_hours"]] = ac_hours
+    x[_IDX["geyser_hours"]] = geyser_hours
+    x[_IDX["waste_kg"]] = waste_kg
+    x[_IDX["water"]] = water_usage
+    return x
+
+
+def apply_all(x):
+    """Every action applied to ``x`` at once: (A, d) matrix of resulting vectors"""
+    return np.clip(np.einsum("aij,j->ai", _M, x) + _C, 0.0, None)
+
+
+def savings(x):
+    """kg CO2/day saved by each action on its own"""
+    return (x - apply_all(x)) @ WEIGHTS
+
+
+def _greedy(x, max_effort, max_cost, max_actions):
+    chosen, groups, effort, cost = [], set(), 0, 0.0
+    while len(chosen) < max_actions:
+        after = apply_all(x)
+        saved = (x - after) @ WEIGHTS
+        ok = ((saved > 0.01) & (effort + _EFFORT <= max_effort) & (cost + _COST <= max_cost)
+              & ~np.isin(np.arange(len(ACTIONS)), chosen)
+              & np.array([a.group is None or a.group not in groups for a in ACTIONS]))
+        if not ok.any():
+            break
+        best = int(np.argmax(np.where(ok, saved / _EFFORT, -np.inf)))
+        chosen.append(best)
+        groups.add(ACTIONS[best].group)
+        effort += ACTIONS[best].effort
+        cost += ACTIONS[best].cost
+        x = after[best]
+        yield best, float(saved[best])
+
+
+def best_plan(inputs, max_effort=6, max_cost=float("inf"), max_actions=5):
+    """
+    ``inputs``: calculator inputs as keyword arguments for feature_vector.
+    Returns {"baseline", "saving", "new_total", "actions": [{label, category,
+    saving, effort, cost}, ...]} with savings in kg CO2/day.
+    """
+    x = feature_vector(**inputs)
+    baseline = float(x @ WEIGHTS)
+    plan = list(_greedy(x, max_effort, max_cost, max_actions))
+    single = savings(x)
+    single[(_EFFORT > max_effort) | (_COST > max_cost)] = -np.inf
+    top = int(np.argmax(single))
+    if np.isfinite(single[top]) and single[top] > sum(s for _, s in plan):
+        plan = [(top, float(single[top]))]
+
+    actions = [{"key": ACTIONS[i].key, "label": ACTIONS[i].label, "category": ACTIONS[i].category,
+                "saving": saved, "effort": ACTIONS[i].effort, "cost": ACTIONS[i].cost}
+               for i, saved in plan]
+    total_saving = sum(a["saving"] for a in actions)
+    return {"baseline": baseline, "saving": total_saving,
+            "new_total": baseline - total_saving, "actions": actions}
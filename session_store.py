@@ -0,0 +1,307 @@
+"""
+Per-session memory budget for ``st.session_state``.
+
+Kiosk sessions are rarely closed cleanly, so everything a visitor produced
+(history, quiz answers, AI answers, audio) would otherwise sit in server RAM
+for the whole exhibition day. ``SessionStateManager`` is called once at the
+top of every script run and:
+
+* tracks the approximate pickled size of each session's large entries,
+* compacts sessions over the byte cap by archiving the older items of long
+  lists to disk (the newest ``keep_recent`` stay in memory) and moving large
+  ``bytes`` blobs to file-backed ``BlobRef`` handles (deleting a blob's
+  file once its key is replaced or popped),
+* spills idle sessions' large entries to disk, leaving ``SpilledValue``
+  placeholders, and restores them lazily on that session's next rerun,
+* forgets (and deletes the files of) sessions Streamlit has dropped.
+"""
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import uuid
+import weakref
+
+DEFAULT_SPILL_KEYS = ("history", "quiz_answers")
+
+
+class SpilledValue:
+    """Placeholder left in session_state while the real value lives on disk"""
+    __slots__ = ("path", "nbytes")
+
+    def __init__(self, path, nbytes):
+        self.path = path
+        self.nbytes = nbytes
+
+    def __repr__(self):
+        return f"SpilledValue({os.path.basename(self.path)}, {self.nbytes} bytes)"
+
+
+class BlobRef:
+    """File-backed handle for a large bytes value (e.g. generated audio)"""
+    __slots__ = ("path", "nbytes")
+
+    def __init__(self, path, nbytes):
+        self.path = path
+        self.nbytes = nbytes
+
+    def read(self) -> bytes:
+        with open(self.path, "rb") as f:
+            return f.read()
+
+    def __repr__(self):
+        return f"BlobRef({os.path.basename(self.path)}, {self.nbytes} bytes)"
+
+
+def approx_size(value) -> int:
+    """Approximate in-memory footprint in bytes (pickled size)"""
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, (SpilledValue, BlobRef)):
+        return 0
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return sys.getsizeof(value)
+
+
+def resolve(value):
+    """Return the real value behind a BlobRef; anything else is returned as-is"""
+    return value.read() if isinstance(value, BlobRef) else value
+
+
+def _write_atomic(path, data: bytes):
+    tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+class _SessionRecord:
+    __slots__ = ("state_ref", "wrapper_ref", "last_seen", "lock", "spilled", "nbytes", "blobs")
+
+    def __init__(self, state):
+        self.state_ref = weakref.ref(state)
+        self.wrapper_ref = None
+        self.last_seen = time.monotonic()
+        self.lock = threading.Lock()
+        self.spilled = False
+        self.nbytes = 0
+        self.blobs = set()  # BlobRef files referenced from session_state at the last run
+
+
+class SessionStateManager:
+    """Shared across all sessions (create it with st.cache_resource)"""
+
+    def __init__(self, spill_dir=None, max_bytes=2_000_000, idle_seconds=600, keep_recent=50,
+                 blob_threshold=64_000, spill_keys=DEFAULT_SPILL_KEYS, sweep_interval=30):
+        self.spill_dir = spill_dir or os.path.join(tempfile.gettempdir(), "greenenergy-sessions")
+        self.max_bytes = max_bytes
+        self.idle_seconds = idle_seconds
+        self.keep_recent = keep_recent
+        self.blob_threshold = blob_threshold
+        self.spill_keys = tuple(spill_keys)
+        self.sweep_interval = sweep_interval
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._last_sweep = 0.0
+        os.makedirs(self.spill_dir, exist_ok=True)
+
+    # ---- public API ----
+    def on_rerun(self, session_id, session_state):
+        """
+        Call at the top of every script run, before session_state is read.
+        ``session_state`` is the run's SafeSessionState (see current_session).
+        """
+        state = getattr(session_state, "_state", session_state)
+        with self._lock:
+            rec = self._sessions.get(session_id)
+            if rec is None or rec.state_ref() is not state:
+                rec = self._sessions[session_id] = _SessionRecord(state)
+            if session_state is not state:
+                rec.wrapper_ref = weakref.ref(session_state)
+            rec.last_seen = time.monotonic()
+
+        with rec.lock:
+            if rec.spilled:
+                self._restore(session_id, state)
+                rec.spilled = False
+            rec.nbytes = self._enforce_budget(session_id, state, rec)
+
+        self._maybe_sweep()
+
+    def session_bytes(self, session_id) -> int:
+        rec = self._sessions.get(session_id)
+        return rec.nbytes if rec else 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            records = list(self._sessions.values())
+        return {
+            "sessions": len(records),
+            "spilled": sum(1 for r in records if r.spilled),
+            "resident_bytes": sum(r.nbytes for r in records if not r.spilled),
+        }
+
+    def archived(self, session_id, key) -> list:
+        """Items previously compacted out of a list entry, oldest first"""
+        path = self._path(session_id, f"{key}.archive")
+        items = []
+        if not os.path.exists(path):
+            return items
+        with open(path, "rb") as f:
+            while True:
+                try:
+                    items.extend(pickle.load(f))
+                except EOFError:
+                    break
+        return items
+
+    def sweep(self):
+        """Spill idle sessions and forget sessions that no longer exist"""
+        now = time.monotonic()
+        with self._lock:
+            items = list(self._sessions.items())
+        for session_id, rec in items:
+            state = rec.state_ref()
+            if state is None:
+                with self._lock:
+                    self._sessions.pop(session_id, None)
+                shutil.rmtree(self._session_dir(session_id), ignore_errors=True)
+                continue
+            if rec.spilled or now - rec.last_seen < self.idle_seconds:
+                continue
+            # Skip sessions that are running right now; the next sweep will catch them
+            if rec.lock.acquire(blocking=False):
+                try:
+                    # The sweep runs on another session's script thread, so take the
+                    # idle session's own SafeSessionState lock before touching it
+                    wrapper = rec.wrapper_ref() if rec.wrapper_ref else None
+                    if wrapper is not None:
+                        with wrapper._lock:
+                            self._spill(session_id, state)
+                    else:
+                        self._spill(session_id, state)
+                    rec.spilled = True
+                finally:
+                    rec.lock.release()
+
+    # ---- internals ----
+    def _session_dir(self, session_id):
+        return os.path.join(self.spill_dir, session_id)
+
+    def _path(self, session_id, name):
+        return os.path.join(self._session_dir(session_id), name)
+
+    def _maybe_sweep(self):
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_sweep < self.sweep_interval:
+                return
+            self._last_sweep = now
+        self.sweep()
+
+    def _enforce_budget(self, session_id, state, rec) -> int:
+        sizes, blobs = {}, set()
+        for key in list(state):
+            if str(key).startswith("$$"):
+                continue  # internal widget ids
+            try:
+                value = state[key]
+            except KeyError:
+                continue
+            if isinstance(value, (bytes, bytearray)) and len(value) >= self.blob_threshold:
+                state[key] = self._store_blob(session_id, key, value)
+                value = state[key]
+            if isinstance(value, BlobRef):
+                blobs.add(value.path)
+            if key in self.spill_keys or isinstance(value, (bytes, bytearray)):
+                sizes[key] = approx_size(value)
+
+        total = sum(sizes.values())
+        while total > self.max_bytes:
+            candidates = [k for k in sizes
+                          if isinstance(state[k], list) and len(state[k]) > self.keep_recent]
+            if not candidates:
+                break
+            key = max(candidates, key=sizes.get)
+            items = state[key]
+            self._archive(session_id, key, items[:-self.keep_recent])
+            state[key] = items[-self.keep_recent:]
+            new_size = approx_size(state[key])
+            total -= sizes[key] - new_size
+            sizes[key] = new_size
+
+        # Blobs whose key was replaced (new audio) or popped since the last run
+        for path in rec.blobs - blobs:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        rec.blobs = blobs
+        return total
+
+    def _store_blob(self, session_id, key, value):
+        os.makedirs(self._session_dir(session_id), exist_ok=True)
+        path = self._path(session_id, f"{key}.{uuid.uuid4().hex[:8]}.blob")
+        _write_atomic(path, bytes(value))
+        return BlobRef(path, len(value))
+
+    def _archive(self, session_id, key, items):
+        os.makedirs(self._session_dir(session_id), exist_ok=True)
+        with open(self._path(session_id, f"{key}.archive"), "ab") as f:
+            pickle.dump(list(items), f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def _spill(self, session_id, state):
+        os.makedirs(self._session_dir(session_id), exist_ok=True)
+        for key in self.spill_keys:
+            if key not in state or isinstance(state[key], SpilledValue):
+                continue
+            data = pickle.dumps(state[key], protocol=pickle.HIGHEST_PROTOCOL)
+            path = self._path(session_id, f"{key}.spill")
+            _write_atomic(path, data)
+            _replace_everywhere(state, key, SpilledValue(path, len(data)))
+
+    def _restore(self, session_id, state):
+        for key in self.spill_keys:
+            if key not in state:
+                continue
+            placeholder = state[key]
+            if not isinstance(placeholder, SpilledValue):
+                continue
+            with open(placeholder.path, "rb") as f:
+                state[key] = pickle.load(f)
+            os.remove(placeholder.path)
+
+
+def _replace_everywhere(state, key, value):
+    """
+    Swap ``key``'s value in SessionState's internal dicts directly. Plain
+    ``state[key] = value`` only writes the new-values dict; the old value
+    would stay referenced from ``_old_state`` until the session's next rerun,
+    so spilling an idle session would free nothing.
+    """
+    new, old = getattr(state, "_new_session_state", None), getattr(state, "_old_state", None)
+    if new is None or old is None:
+        state[key] = value
+        return
+    if key in old:
+        old[key] = value
+    if key in new or key not in old:
+        new[key] = value
+
+
+def current_session():
+    """(session_id, SafeSessionState) for the running script, or (None, None) outside Streamlit"""
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+    ctx = get_script_run_ctx()
+    if ctx is None:
+        return None, None
+    # The SafeSessionState wrapper is recreated with each script runner; the
+    # manager tracks the long-lived SessionState underneath so idle sessions
+    # can be reached, and the wrapper only for its lock.
+    return ctx.session_id, ctx.session_state
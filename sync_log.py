@@ -0,0 +1,344 @@
+"""
+Offline-first history sync between exhibition kiosks.
+
+Every kiosk (a separate Streamlit instance) appends what its visitors do -
+carbon calculations, quiz scores, AI questions and answers - to its own
+append-only JSON-lines log, one line per event with a globally unique id.
+Kiosks never talk to each other directly. A sync seals the kiosk's new
+events into a Parquet batch and exchanges batches through a shared
+directory (network share or USB stick):
+
+    shared/
+        kiosk-a/kiosk-a-000003-1a2b3c4d.parquet
+        kiosk-b/kiosk-b-000001-9f8e7d6c.parquet
+
+Export copies every batch this kiosk knows about (its own and the ones it
+imported) that the destination lacks, so a stick carried from kiosk to kiosk
+spreads everything. Import is idempotent: batches are identified by name and
+events by id, so syncing the same stick twice never double-counts.
+
+    python sync_log.py sync /media/usb        # export + import
+    python sync_log.py export /media/usb
+    python sync_log.py import /media/usb
+    python sync_log.py status
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import socket
+import threading
+import time
+import uuid
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+SCHEMA = pa.schema([
+    ("id", pa.string()),
+    ("node", pa.string()),
+    ("ts", pa.float64()),
+    ("kind", pa.string()),
+    ("session", pa.string()),
+    ("data", pa.string()),  # JSON, so every event kind shares one schema
+])
+_BATCH_NAME = re.compile(r"^(?P<node>[A-Za-z0-9_.-]+)-\d{6}-[0-9a-f]{8}\.parquet$")
+
+
+def _slug(text):
+    return re.sub(r"[^A-Za-z0-9_.-]+", "-", str(text)).strip("-") or "kiosk"
+
+
+class SyncLog:
+    """One per kiosk (create it with st.cache_resource); safe to share between sessions"""
+
+    def __init__(self, root="kiosk_data", node_id=None):
+        self.root = os.path.abspath(root)
+        self.batch_dir = os.path.join(self.root, "batches")
+        os.makedirs(self.batch_dir, exist_ok=True)
+        self._state_path = os.path.join(self.root, "sync_state.json")
+        self._lock = threading.Lock()       # writers: append / seal
+        self._read_lock = threading.Lock()  # reading caches below; append() never waits on it
+        self.node = self._stored_node_id(node_id)
+        self.log_path = self._log_path(self.node)
+        self._local = SCHEMA.empty_table()  # parsed local log, extended incrementally
+        self._local_offset = 0    # bytes of the log already parsed
+        self._batches = {}        # batch path -> pyarrow.Table (other kiosks)
+        self._frames = {}         # kind -> (batch paths, local rows included, events DataFrame)
+        self._expanded = {}       # kind -> (events DataFrame, frame() result)
+
+    def _stored_node_id(self, node_id=None):
+        """
+        Kiosk id, remembered in the data dir so the app and the CLI agree.
+        When the id changes (e.g. KIOSK_ID set after a first run without it),
+        the old log's unsealed tail is sealed under the old id first.
+        """
+        path = os.path.join(self.root, "node_id")
+        stored = None
+        if os.path.exists(path):
+            with open(path) as f:
+                stored = f.read().strip()
+        node = _slug(node_id) if node_id else stored or _slug(f"{socket.gethostname()}-{uuid.uuid4().hex[:4]}")
+        if stored:
+            self._migrate_state(stored)
+        if node != stored:
+            if stored:
+                self._seal_log(stored)
+            with open(path, "w") as f:
+                f.write(node)
+        return node
+
+    def _log_path(self, node):
+        return os.path.join(self.root, f"events-{node}.jsonl")
+
+    def _load_state(self):
+        """{"logs": {node: {"sealed_offset", "batches"}}} - offsets belong to one node's log"""
+        if not os.path.exists(self._state_path):
+            return {"logs": {}}
+        with open(self._state_path) as f:
+            return json.load(f)
+
+    def _migrate_state(self, node):
+        """Older state files had a single offset; it belongs to the stored node's log"""
+        state = self._load_state()
+        if "sealed_offset" in state:
+            self._save_state({"logs": {node: {"sealed_offset": state["sealed_offset"],
+                                              "batches": state["batches"]}}})
+
+    def _save_state(self, state):
+        tmp = self._state_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp, self._state_path)
+
+    # ================================
+    # LOCAL LOG
+    # ================================
+    def append(self, kind, data, session=None):
+        """Record one event; returns its id"""
+        event = {
+            "id": uuid.uuid4().hex,
+            "node": self.node,
+            "ts": time.time(),
+            "kind": kind,
+            "session": str(session or ""),
+            "data": json.dumps(data, default=str, ensure_ascii=False),
+        }
+        line = (json.dumps(event, ensure_ascii=False) + "\n").encode("utf-8")
+        with self._lock:
+            # One write per line on an O_APPEND file, so lines never interleave
+            fd = os.open(self.log_path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+            try:
+                os.write(fd, line)
+            finally:
+                os.close(fd)
+        return event["id"]
+
+    def _read_local(self):
+        """Local events as an Arrow table, parsing only what was appended since the last call"""
+        if not os.path.exists(self.log_path):
+            return self._local
+        with open(self.log_path, "rb") as f:
+            f.seek(self._local_offset)
+            chunk = f.read()
+        end = chunk.rfind(b"\n") + 1  # ignore a half-written last line
+        rows = [json.loads(line) for line in chunk[:end].splitlines() if line.strip()]
+        if rows:
+            self._local = pa.concat_tables([self._local, pa.Table.from_pylist(rows, schema=SCHEMA)])
+            if self._local.column("id").num_chunks > 64:
+                self._local = self._local.combine_chunks()
+        self._local_offset += end
+        return self._local
+
+    # ================================
+    # BATCHES
+    # ================================
+    def _node_batches(self, root):
+        """{batch name: path} for every well-formed batch under ``root``/<node>/"""
+        found = {}
+        if not os.path.isdir(root):
+            return found
+        for node in os.listdir(root):
+            node_dir = os.path.join(root, node)
+            if not os.path.isdir(node_dir):
+                continue
+            for name in os.listdir(node_dir):
+                match = _BATCH_NAME.match(name)
+                if match and match.group("node") == node:
+                    found[name] = os.path.join(node_dir, name)
+        return found
+
+    def seal(self):
+        """Write local events not yet in a batch as a new Parquet batch; returns its path or None"""
+        with self._lock:
+            return self._seal_log(self.node)
+
+    def _seal_log(self, node):
+        state = self._load_state()
+        progress = state["logs"].setdefault(node, {"sealed_offset": 0, "batches": 0})
+        log_path = self._log_path(node)
+        if not os.path.exists(log_path):
+            return None
+        with open(log_path, "rb") as f:
+            f.seek(progress["sealed_offset"])
+            chunk = f.read()
+        end = chunk.rfind(b"\n") + 1
+        rows = [json.loads(line) for line in chunk[:end].splitlines() if line.strip()]
+        if not rows:
+            return None
+        table = pa.Table.from_pylist(rows, schema=SCHEMA)
+        seq = progress["batches"] + 1
+        name = f"{node}-{seq:06d}-{rows[0]['id'][:8]}.parquet"
+        path = os.path.join(self.batch_dir, node, name)
+        _write_atomic(table, path)
+        progress.update(sealed_offset=progress["sealed_offset"] + end, batches=seq)
+        self._save_state(state)
+        return path
+
+    def export(self, dest):
+        """Seal, then copy every known batch missing from ``dest``; returns the number copied"""
+        self.seal()
+        present = self._node_batches(dest)
+        copied = 0
+        for name, path in self._node_batches(self.batch_dir).items():
+            if name in present:
+                continue
+            target = os.path.join(dest, os.path.basename(os.path.dirname(path)), name)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copyfile(path, target + ".tmp")
+            os.replace(target + ".tmp", target)
+            copied += 1
+        return copied
+
+    def import_from(self, src):
+        """Bring in other kiosks' batches from ``src``; returns (batches, events in them)"""
+        known = self._node_batches(self.batch_dir)
+        batches = events = 0
+        for name, path in sorted(self._node_batches(src).items()):
+            if name in known:
+                continue
+            try:
+                table = pq.read_table(path, schema=SCHEMA)
+            except (pa.ArrowException, OSError):
+                continue  # half-copied or foreign file; next sync retries it
+            node = os.path.basename(os.path.dirname(path))
+            _write_atomic(table, os.path.join(self.batch_dir, node, name))
+            batches += 1
+            events += table.num_rows
+        return batches, events
+
+    def sync(self, shared_dir):
+        """Export then import through one shared directory"""
+        exported = self.export(shared_dir)
+        imported, events = self.import_from(shared_dir)
+        return {"exported": exported, "imported": imported, "events": events}
+
+    # ================================
+    # READING
+    # ================================
+    def _other_kiosks(self):
+        """(sorted batch paths, concatenated table) of every other kiosk's batches (new files read once)"""
+        paths = tuple(sorted(p for n, p in self._node_batches(self.batch_dir).items()
+                             if _BATCH_NAME.match(n).group("node") != self.node))
+        for path in set(paths) - self._batches.keys():
+            self._batches[path] = pq.read_table(path, schema=SCHEMA)
+        tables = [self._batches[p] for p in paths]
+        return paths, pa.concat_tables(tables) if tables else SCHEMA.empty_table()
+
+    def events(self, kind=None):
+        """
+        All kiosks' events as a DataFrame (time, node, kind, session, data dict),
+        oldest first. Cached per kind and extended with new local events only,
+        so reruns cost nothing until something changes; don't modify the result.
+        """
+        with self._read_lock:
+            local = self._read_local()
+            paths, others = self._other_kiosks()
+            cached = self._frames.get(kind)
+            if cached is not None and cached[0] == paths:
+                _, seen, df = cached
+                if seen < local.num_rows:
+                    new = _to_frame(local.slice(seen), kind)
+                    if len(new):
+                        df = pd.concat([df, new]).sort_values("ts", kind="stable").reset_index(drop=True)
+            else:
+                df = _to_frame(pa.concat_tables([local, others]), kind)
+            self._frames[kind] = (paths, local.num_rows, df)
+            return df
+
+    def frame(self, kind):
+        """events(kind) with the data dicts expanded into columns"""
+        df = self.events(kind)
+        cached = self._expanded.get(kind)
+        if cached is not None and cached[0] is df:
+            return cached[1]
+        fields = pd.DataFrame(df["data"].tolist(), index=df.index)
+        fields = fields.drop(columns=[c for c in fields.columns if c in df.columns])
+        expanded = pd.concat([df.drop(columns=["data"]), fields], axis=1)
+        self._expanded[kind] = (df, expanded)
+        return expanded
+
+    def status(self):
+        state = self._load_state()
+        nodes = {os.path.basename(os.path.dirname(p)) for p in self._node_batches(self.batch_dir).values()}
+        with self._read_lock:
+            local_events = self._read_local().num_rows
+        return {
+            "node": self.node,
+            "local_events": local_events,
+            "sealed_batches": state["logs"].get(self.node, {}).get("batches", 0),
+            "kiosks": sorted(nodes | {self.node}),
+        }
+
+
+def _to_frame(table, kind=None):
+    """Arrow events -> DataFrame with parsed data; filtering first keeps e.g. AI answers out of pandas"""
+    if kind is not None:
+        table = table.filter(pc.equal(table["kind"], kind))
+    df = table.to_pandas().drop_duplicates("id").sort_values("ts", kind="stable")
+    df["time"] = pd.to_datetime(df["ts"], unit="s")
+    df["data"] = df["data"].map(json.loads)
+    return df.reset_index(drop=True)
+
+
+def _write_atomic(table, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    pq.write_table(table, path + ".tmp", compression="zstd")
+    os.replace(path + ".tmp", path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync kiosk event logs through a shared directory or USB stick")
+    parser.add_argument("command", choices=["sync", "export", "import", "status"])
+    parser.add_argument("shared_dir", nargs="?", help="Shared directory / USB mount (not needed for status)")
+    parser.add_argument("--root", default="kiosk_data", help="This kiosk's data directory")
+    parser.add_argument("--node", default=None, help="Kiosk id (default: stored/generated)")
+    args = parser.parse_args()
+    if args.command != "status" and not args.shared_dir:
+        parser.error(f"{args.command} needs a shared directory")
+
+    log = SyncLog(args.root, args.node)
+    start = time.perf_counter()
+    if args.command == "sync":
+        result = log.sync(args.shared_dir)
+        print(f"🔄 exported {result['exported']} batches, imported {result['imported']} "
+              f"({result['events']} events)")
+    elif args.command == "export":
+        print(f"📤 exported {log.export(args.shared_dir)} batches")
+    elif args.command == "import":
+        batches, events = log.import_from(args.shared_dir)
+        print(f"📥 imported {batches} batches ({events} events)")
+    else:
+        status = log.status()
+        print(f"🖥️ {status['node']}: {status['local_events']} local events, "
+              f"{status['sealed_batches']} batches sealed")
+        print(f"   kiosks known: {', '.join(status['kiosks'])}")
+    if args.command != "status":
+        print(f"   in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()